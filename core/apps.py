@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        # Connect the model signal handlers
+        from . import signals
+        from .database import configure_sqlite
+        from .instrumentation import install_query_recorder
+        connection_created.connect(configure_sqlite, dispatch_uid='core.database')
+        connection_created.connect(install_query_recorder, dispatch_uid='core.instrumentation')
@@ -0,0 +1,190 @@
+"""
+Native async views, meant to be served by the ASGI app.
+
+DRF's APIView has no async support, so these are plain Django views that
+reproduce the DRF endpoints' authentication, permission check, pagination
+and JSON output on top of the async ORM and async cache API. While a client
+is slow or a stream is open, the request holds no worker thread.
+"""
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
+from rest_framework.request import Request
+
+from . import events, filters, projections, queries
+from .authentication import AsyncJWTAuthentication
+from .cache import CACHE_CONTROL, aresponse_cache_key, etag_matches, response_etag
+from .instrumentation import record_cache
+from .models import Project
+from .pagination import CustomPageNumberPagination, ListPageNumberPagination, get_paginator
+from .renderers import FastJSONRenderer
+from .roles import role_cache
+
+
+async def authenticate_member(request):
+    """
+    Authenticate the JWT of ``request`` and require the member role, as
+    ``IsAuthenticated`` plus ``MemberPermission`` do for the DRF views.
+    Returns ``(user, None)``, or ``(None, error_response)``.
+    """
+    try:
+        result = await AsyncJWTAuthentication().aauthenticate(request)
+    except AuthenticationFailed as e:
+        detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+        return None, JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+    if result is None:
+        return None, JsonResponse({'detail': 'Authentication credentials were not provided.'},
+                                  status=status.HTTP_401_UNAUTHORIZED)
+    user = result[0]
+    roles = getattr(user, 'claimed_roles', None)
+    if roles is None:
+        roles = await role_cache.aget(user.pk)
+    if 'member' not in roles:
+        return None, JsonResponse({'detail': 'You do not have permission to perform this action.'},
+                                  status=status.HTTP_403_FORBIDDEN)
+    return user, None
+
+
+class AsyncListView(View):
+    """
+    Base view for the async list endpoints. Subclasses set the query plan,
+    projection, page-number class and keyset ordering of the DRF view they
+    mirror; responses are the same JSON, cached the same way.
+    """
+    query_plan = None
+    projection = None
+    list_filter = None
+    page_number_class = ListPageNumberPagination
+    ordering = ('id',)
+
+    def build_results(self, data):
+        return data
+
+    async def get(self, request):
+        user, error = await authenticate_member(request)
+        if error:
+            return error
+        request = Request(request)
+        request.user = user
+
+        try:
+            key = await aresponse_cache_key(request, [self.query_plan.model])
+            etag = response_etag(request, key, 'application/json')
+            headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+            if etag_matches(request, etag):
+                return HttpResponseNotModified(headers=headers)
+            data = await cache.aget(key)
+            record_cache(data is not None)
+            if data is None:
+                paginator = get_paginator(request, self.page_number_class, self.ordering)
+                queryset, fields = self.query_plan.queryset(), None
+                if self.list_filter is not None:
+                    queryset, fields = self.list_filter.apply(queryset, request, self.ordering)
+                rows = self.projection.values(queryset.order_by('id'), fields, self.ordering)
+                rows = await paginator.apaginate_queryset(rows, request)
+                results = self.projection.render(rows, fields)
+                data = paginator.get_paginated_response(self.build_results(results)).data
+                await cache.aset(key, data, settings.CORE_CACHE_TIMEOUT)
+            return HttpResponse(FastJSONRenderer().render(data), content_type='application/json',
+                                headers=headers)
+        except ValidationError as e:
+            return JsonResponse({'Status':False,'error':e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except NotFound as e:
+            return JsonResponse({'Status':False,'Message':str(e.detail)},
+                                status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            print(e)
+            return JsonResponse({'Status':False,'Message':'Something unexpected occured'},
+                                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AsyncProjectView(AsyncListView):
+    """
+    AsyncProjectView is the async counterpart of ProjectView.
+    Only authenticated users with member permissions can access this view.
+
+    """
+    query_plan = queries.PROJECT_LIST
+    projection = projections.PROJECT_LIST
+    page_number_class = CustomPageNumberPagination
+
+    def build_results(self, data):
+        return {'data': data, 'message': 'Success'}
+
+
+class AsyncTaskView(AsyncListView):
+    """
+    AsyncTaskView is the async counterpart of TaskView.
+    Only authenticated users with member permissions can access this view.
+
+    """
+    query_plan = queries.TASK_LIST
+    projection = projections.TASK_LIST
+    list_filter = filters.TASK_FILTER
+
+
+class AsyncMilestoneView(AsyncListView):
+    """
+    AsyncMilestoneView is the async counterpart of MilestoneView.
+    Only authenticated users with member permissions can access this view.
+
+    """
+    query_plan = queries.MILESTONE_LIST
+    projection = projections.MILESTONE_LIST
+    list_filter = filters.MILESTONE_FILTER
+    ordering = ('due_date', 'id')
+
+
+class EventStream(View):
+    """
+    EventStream streams task, milestone and notification events for the
+    requesting user's projects as Server-Sent Events. Authenticate with the
+    usual ``Authorization: Bearer <access token>`` header; only users with
+    member permissions can subscribe.
+
+    """
+
+    async def get(self, request):
+        user, error = await authenticate_member(request)
+        if error:
+            return error
+
+        response = StreamingHttpResponse(self.stream(user.pk), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+        return response
+
+    @staticmethod
+    async def project_ids(user_id):
+        # Projects the user owns or has tasks assigned in
+        projects = Project.objects.filter(
+            Q(project_owner__user=user_id) | Q(task__assigned_to=user_id)
+        ).values_list('id', flat=True)
+        return {pk async for pk in projects}
+
+    async def stream(self, user_id):
+        subscription = events.get_backend().subscribe()
+        loop = asyncio.get_running_loop()
+        projects, refreshed = set(), None
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                if refreshed is None or loop.time() - refreshed > settings.CORE_EVENT_PROJECT_REFRESH:
+                    projects = await self.project_ids(user_id)
+                    refreshed = loop.time()
+
+                event = await subscription.get(timeout=settings.CORE_EVENT_HEARTBEAT)
+                if event is None:
+                    yield ': keep-alive\n\n'
+                elif (event.get('user') == user_id or event.get('assigned_to') == user_id
+                        or event.get('project') in projects):
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            await subscription.close()
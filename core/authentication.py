@@ -0,0 +1,179 @@
+"""
+JWT authentication for the core and user APIs.
+
+With ``CORE_STATELESS_AUTH`` on, ``LoginView`` issues access tokens that
+carry the user's roles and a token *generation*: a keyed hash of the
+password hash, the active flag and the roles. ``ClaimsJWTAuthentication``
+then builds a ``ClaimsUser`` from the token without touching the database
+and only compares the claimed generation with the current one, which lives
+in the shared cache. A password change, deactivation or role change drops
+the cached value, so it is recomputed and no longer matches the tokens
+issued before; those are rejected and the client has to log in again.
+
+Tokens without these claims (issued before, or with the mode off) go
+through the regular user lookup.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .roles import TOKEN_GENERATION_KEY
+
+
+ROLES_CLAIM = 'roles'
+GENERATION_CLAIM = 'gen'
+
+
+def compute_token_generation(user, roles):
+    value = f'{user.password}|{user.is_active}|{",".join(sorted(roles))}'
+    return salted_hmac('core.authentication.generation', value).hexdigest()[:16]
+
+
+def current_roles(user_id):
+    # Straight from the database: the role cache's local level may lag
+    # behind a change made in another process.
+    return frozenset(Group.objects.filter(user=user_id).values_list('name', flat=True))
+
+
+def _load_token_generation(user_id):
+    user = User.objects.filter(pk=user_id).only('password', 'is_active').first()
+    if user is None:
+        return None
+    return compute_token_generation(user, current_roles(user_id))
+
+
+def token_generation(user_id):
+    """
+    Return the current token generation of a user, or None if the user no
+    longer exists.
+    """
+    key = TOKEN_GENERATION_KEY.format(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = _load_token_generation(user_id)
+        if generation is not None:
+            cache.set(key, generation, settings.CORE_TOKEN_GENERATION_TTL)
+    return generation
+
+
+async def atoken_generation(user_id):
+    key = TOKEN_GENERATION_KEY.format(user_id)
+    generation = await cache.aget(key)
+    if generation is None:
+        generation = await sync_to_async(_load_token_generation)(user_id)
+        if generation is not None:
+            await cache.aset(key, generation, settings.CORE_TOKEN_GENERATION_TTL)
+    return generation
+
+
+def add_token_claims(token, user):
+    """
+    Add the roles and generation claims to a token issued for ``user``.
+    """
+    if settings.CORE_STATELESS_AUTH:
+        roles = current_roles(user.pk)
+        generation = compute_token_generation(user, roles)
+        cache.set(TOKEN_GENERATION_KEY.format(user.pk), generation, settings.CORE_TOKEN_GENERATION_TTL)
+        token[ROLES_CLAIM] = sorted(roles)
+        token[GENERATION_CLAIM] = generation
+    return token
+
+
+class ClaimsUser(TokenUser):
+    """
+    Stateless user built from a validated access token. ``claimed_roles`` is
+    read by ``core.roles.get_roles``.
+    """
+
+    @cached_property
+    def claimed_roles(self):
+        return frozenset(self.token[ROLES_CLAIM])
+
+
+def is_stateless(validated_token):
+    return (settings.CORE_STATELESS_AUTH and ROLES_CLAIM in validated_token
+            and GENERATION_CLAIM in validated_token)
+
+
+def revoked():
+    return AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that trusts the role claims of stateless tokens once
+    their generation checks out, instead of loading the user row.
+    """
+
+    def get_user(self, validated_token):
+        if not is_stateless(validated_token):
+            return super().get_user(validated_token)
+        user = self.get_token_user(validated_token)
+        if validated_token[GENERATION_CLAIM] != token_generation(user.id):
+            raise revoked()
+        return user
+
+    def get_token_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return ClaimsUser(validated_token)
+
+
+class AsyncJWTAuthentication(ClaimsJWTAuthentication):
+    """
+    ClaimsJWTAuthentication with a native async ``aauthenticate``: the token
+    is checked in the event loop and the user row, when needed, is fetched
+    with the async ORM.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        if is_stateless(validated_token):
+            user = self.get_token_user(validated_token)
+            if validated_token[GENERATION_CLAIM] != await atoken_generation(user.id):
+                raise revoked()
+            return user
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
@@ -0,0 +1,432 @@
+"""
+Offline benchmark harness for the core and user APIs.
+
+``benchmark_environment`` runs a block against a throwaway test database
+with the locmem cache, eager Celery, locmem email and the in-memory event
+backend, so benchmarks need neither Redis nor a broker. ``seed`` fills it
+with bulk-created data. ``SCENARIOS`` holds one request recipe per named
+URL of ``core.urls`` and ``user.urls``, and ``run_scenario`` measures
+latency, queries and allocations for one of them. The management commands
+in ``core/management/commands`` build on these.
+"""
+import asyncio
+import itertools
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from projectmanagement.celery import app as celery_app
+from . import changes, counters, events
+from .authentication import add_token_claims
+from .models import Project, ProjectUser, Task, Milestone
+from .pagination import CustomPageNumberPagination, ListPageNumberPagination
+from .roles import role_cache, role_registry
+
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+BENCHMARK_SETTINGS = {
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+    'CORE_EVENT_BACKEND': 'core.events.InMemoryEventBackend',
+    'DEBUG': False,
+    # The test client's host; outside the test runner nothing adds it
+    'ALLOWED_HOSTS': ['testserver'],
+}
+
+
+@contextmanager
+def benchmark_environment(on_disk=False):
+    """
+    With ``on_disk``, an SQLite test database is a temporary file rather
+    than the shared in-memory database, which serializes every access and
+    cannot use WAL; concurrent-write benchmarks need it.
+    """
+    eager = celery_app.conf.task_always_eager
+    celery_app.conf.task_always_eager = True
+    events._backend = None
+    role_cache.clear()
+    role_registry.clear()
+    test_settings = connection.settings_dict['TEST']
+    with override_settings(**BENCHMARK_SETTINGS), tempfile.TemporaryDirectory() as directory:
+        if on_disk and connection.vendor == 'sqlite':
+            connection.settings_dict['TEST'] = {**test_settings, 'NAME': os.path.join(directory, 'benchmark.sqlite3')}
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            connection.settings_dict['TEST'] = test_settings
+            celery_app.conf.task_always_eager = eager
+            events._backend = None
+            role_cache.clear()
+            role_registry.clear()
+
+
+def seed(users=10, projects=10, tasks=1000, milestones=200, batch_size=1000):
+    """
+    Bulk-create the given volumes. Every user is a ProjectUser with all
+    three roles, so any of them can call every endpoint; the first one can
+    log in with ``BENCHMARK_PASSWORD``. Returns the users.
+    """
+    User.objects.bulk_create(
+        [User(username=f'bench{i}', email=f'bench{i}@example.com') for i in range(users)],
+        batch_size=batch_size,
+    )
+    user_list = list(User.objects.filter(username__startswith='bench').order_by('id'))
+    user_list[0].set_password(BENCHMARK_PASSWORD)
+    user_list[0].save(update_fields=['password'])
+
+    group_ids = role_registry.group_ids().values()
+    User.groups.through.objects.bulk_create(
+        [User.groups.through(user_id=user.id, group_id=group_id) for user in user_list for group_id in group_ids],
+        batch_size=batch_size, ignore_conflicts=True,
+    )
+    ProjectUser.objects.bulk_create(
+        [ProjectUser(user=user, role='admin') for user in user_list], batch_size=batch_size,
+    )
+    owners = list(ProjectUser.objects.order_by('id'))
+
+    Project.objects.bulk_create(
+        [Project(name=f'Project {i}', project_owner=owners[i % len(owners)]) for i in range(projects)],
+        batch_size=batch_size,
+    )
+    project_list = list(Project.objects.order_by('id'))
+
+    Task.objects.bulk_create(
+        [Task(project=project_list[i % len(project_list)], name=f'Task {i}',
+              assigned_to=user_list[i % len(user_list)]) for i in range(tasks)],
+        batch_size=batch_size,
+    )
+    Milestone.objects.bulk_create(
+        [Milestone(project=project_list[i % len(project_list)], name=f'Milestone {i}',
+                   due_date=f'2024-{1 + i % 12:02d}-{1 + i % 28:02d}') for i in range(milestones)],
+        batch_size=batch_size,
+    )
+    counters.recount()
+    return user_list
+
+
+def auth_headers(user):
+    # Same claims as a token from LoginView
+    token = add_token_claims(RefreshToken.for_user(user), user)
+    return {'Authorization': f'Bearer {token.access_token}'}
+
+
+def wsgi_throughput(urls, headers, concurrency):
+    """
+    Requests per second for ``urls`` through the WSGI handler, with
+    ``concurrency`` client threads.
+    """
+    def fetch(url):
+        Client().get(url, headers=headers)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(fetch, urls))
+    return len(urls) / (time.perf_counter() - start)
+
+
+def asgi_throughput(urls, headers, concurrency):
+    """
+    Requests per second for ``urls`` through the ASGI handler, with
+    ``concurrency`` concurrent requests in one event loop.
+    """
+    async def run():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(url):
+            async with semaphore:
+                await client.get(url, headers=headers)
+
+        await asyncio.gather(*(fetch(url) for url in urls))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return len(urls) / (time.perf_counter() - start)
+
+
+def login_throughput(attempts, concurrency, busy_retry=0.25):
+    """
+    Post ``(username, password, client_ip)`` login attempts to /user/login
+    from ``concurrency`` threads. A 503 from a saturated hashing pool is
+    retried after ``busy_retry`` seconds, as a client honouring Retry-After
+    would, and counted. Returns ``(elapsed seconds, Counter of final status
+    codes plus 'busy' retries, latencies in seconds)``.
+    """
+    def attempt(args):
+        username, password, ip = args
+        client, busy = Client(REMOTE_ADDR=ip), 0
+        start = time.perf_counter()
+        while True:
+            response = client.post('/user/login', {'username': username, 'password': password})
+            if response.status_code != 503:
+                return response.status_code, busy, time.perf_counter() - start
+            busy += 1
+            time.sleep(busy_retry)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(attempt, attempts))
+    elapsed = time.perf_counter() - start
+    statuses = Counter(code for code, _, _ in results)
+    statuses['busy'] = sum(busy for _, busy, _ in results)
+    return elapsed, statuses, [latency for _, _, latency in results]
+
+
+def write_throughput(payloads, headers, concurrency):
+    """
+    Post task ``payloads`` to /core/taskcreate from ``concurrency`` threads,
+    each with its own database connection, closed when the thread is done.
+    Returns ``(elapsed seconds, Counter of status codes, latencies in
+    seconds)``. Failed writes (such as "database is locked") surface as 500s.
+    """
+    payloads = iter(payloads)
+    lock = threading.Lock()
+    results = []
+
+    def worker():
+        client = Client()
+        try:
+            while True:
+                with lock:
+                    payload = next(payloads, None)
+                if payload is None:
+                    return
+                start = time.perf_counter()
+                response = client.post('/core/taskcreate', payload, content_type='application/json',
+                                       headers=headers)
+                results.append((response.status_code, time.perf_counter() - start))
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return elapsed, Counter(code for code, _ in results), [latency for _, latency in results]
+
+
+class BenchmarkContext:
+    """
+    State shared by the scenarios: the acting user, ids of seeded rows and
+    a counter for unique names.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.headers = auth_headers(user)
+        self.project_user = ProjectUser.objects.filter(user=user).first()
+        self.projects = list(Project.objects.order_by('id').values_list('id', flat=True))
+        self.tasks = list(Task.objects.order_by('id').values_list('id', flat=True))
+        self.milestones = list(Milestone.objects.order_by('id').values_list('id', flat=True))
+        self.counter = itertools.count()
+        self._sync_token = None
+
+    def pick(self, ids, i):
+        return ids[i % len(ids)]
+
+    def page(self, ids, i, pagination):
+        """
+        Cycle through the pages that ``ids`` fill with ``pagination``'s page
+        size, so no request asks for a page past the end.
+        """
+        return 1 + i % max(1, math.ceil(len(ids) / pagination.page_size))
+
+    def new_task(self):
+        return Task.objects.create(project_id=self.projects[0], name='Scratch task')
+
+    def new_milestone(self):
+        return Milestone.objects.create(project_id=self.projects[0], name='Scratch milestone',
+                                        due_date='2024-06-15')
+
+    def sync_token(self):
+        """
+        The token of a client that has synced everything seeded, so the
+        changes scenario measures an incremental sync.
+        """
+        if self._sync_token is None:
+            page = changes.changes()
+            while page['has_more']:
+                page = changes.changes(page['next'])
+            self._sync_token = page['next']
+        return self._sync_token
+
+
+BULK_SIZE = 100
+
+# url name -> build(context, iteration) returning (method, query or body).
+# Setup done inside build (e.g. creating the row a delete removes) is not
+# measured.
+SCENARIOS = {
+    'project-view': lambda c, i: ('get', {'page': c.page(c.projects, i, CustomPageNumberPagination)}),
+    'projectsummary': lambda c, i: ('get', {}),
+    'projectcreate': lambda c, i: ('post', {'name': f'Bench {next(c.counter)}',
+                                            'project_owner': c.project_user.id}),
+    'projectupdate': lambda c, i: ('put', {'id': c.pick(c.projects, i), 'description': f'Run {i}'}),
+    'projectdelete': lambda c, i: ('delete', {'id': Project.objects.create(
+        name='Scratch project', project_owner=c.project_user).id}),
+    'taskview': lambda c, i: ('get', {'page': c.page(c.tasks, i, ListPageNumberPagination)}),
+    'taskcreate': lambda c, i: ('post', {'project': c.pick(c.projects, i), 'name': f'Bench {i}',
+                                         'assigned_to': c.user.id}),
+    'taskupdate': lambda c, i: ('put', {'id': c.pick(c.tasks, i), 'name': f'Run {i}'}),
+    'taskdelete': lambda c, i: ('delete', {'id': c.new_task().id}),
+    'milestoneview': lambda c, i: ('get', {'page': c.page(c.milestones, i, ListPageNumberPagination)}),
+    'milestonecreate': lambda c, i: ('post', {'project': c.pick(c.projects, i), 'name': f'Bench {i}',
+                                              'due_date': '2024-06-15'}),
+    'milestoneupdate': lambda c, i: ('put', {'id': c.pick(c.milestones, i), 'name': f'Run {i}'}),
+    'milestonedelete': lambda c, i: ('delete', {'id': c.new_milestone().id}),
+    'taskbulkcreate': lambda c, i: ('post', [{'project': c.pick(c.projects, n), 'name': f'Bulk {n}',
+                                              'assigned_to': c.user.id} for n in range(BULK_SIZE)]),
+    'taskbulkupdate': lambda c, i: ('put', [{'id': id, 'name': f'Run {i}'}
+                                            for id in c.tasks[:BULK_SIZE]]),
+    'taskbulkdelete': lambda c, i: ('delete', {'ids': [c.new_task().id for _ in range(10)]}),
+    'milestonebulkcreate': lambda c, i: ('post', [{'project': c.pick(c.projects, n), 'name': f'Bulk {n}',
+                                                   'due_date': '2024-06-15'} for n in range(BULK_SIZE)]),
+    'milestonebulkupdate': lambda c, i: ('put', [{'id': id, 'name': f'Run {i}'}
+                                                 for id in c.milestones[:BULK_SIZE]]),
+    'milestonebulkdelete': lambda c, i: ('delete', {'ids': [c.new_milestone().id for _ in range(10)]}),
+    'notificationview': lambda c, i: ('get', {}),
+    'notificationcount': lambda c, i: ('get', {}),
+    'notificationread': lambda c, i: ('put', {'all': True}),
+    'asyncproject': lambda c, i: ('get', {'page': c.page(c.projects, i, CustomPageNumberPagination)}),
+    'asynctaskview': lambda c, i: ('get', {'page': c.page(c.tasks, i, ListPageNumberPagination)}),
+    'asyncmilestoneview': lambda c, i: ('get', {'page': c.page(c.milestones, i, ListPageNumberPagination)}),
+    'changes': lambda c, i: ('get', {'since': c.sync_token()}),
+    'projectexport': lambda c, i: ('get', {}),
+    'taskexport': lambda c, i: ('get', {}),
+    'milestoneexport': lambda c, i: ('get', {'output': 'csv'}),
+    'login': lambda c, i: ('post', {'username': c.user.username, 'password': BENCHMARK_PASSWORD}),
+    'createuser': lambda c, i: ('post', {'username': f'new{next(c.counter)}', 'password': 'password123',
+                                         'email': 'new@example.com', 'role': 'member'}),
+    'provision': lambda c, i: ('post', [{'username': f'bulk{next(c.counter)}', 'password': 'password123',
+                                         'email': 'new@example.com', 'role': 'member'} for _ in range(5)]),
+}
+
+# url name -> build(context, iteration) returning the URL's arguments
+URL_KWARGS = {
+    'projectsummary': lambda c, i: {'id': c.pick(c.projects, i)},
+}
+
+# Scenarios dominated by password hashing run at most this many times
+SLOW_SCENARIOS = {
+    'login': 10,
+    'createuser': 10,
+    'provision': 3,
+}
+
+# Named URLs that are deliberately not benchmarked, with the reason
+EXCLUDED = {
+    'eventstream': 'long-lived Server-Sent Events stream',
+    'metrics': 'Prometheus scrape target, not client traffic',
+}
+
+
+def send(client, context, name, i):
+    """
+    Issue one request of scenario ``name``. The request is built before the
+    returned callable is invoked, so setup stays outside any timing.
+    """
+    method, payload = SCENARIOS[name](context, i)
+    path = reverse(name, kwargs=URL_KWARGS[name](context, i) if name in URL_KWARGS else None)
+    if method == 'get':
+        request = lambda: client.get(path, payload, headers=context.headers)
+    else:
+        body = json.dumps(payload)
+        request = lambda: getattr(client, method)(path, body, content_type='application/json',
+                                                  headers=context.headers)
+
+    def run():
+        response = request()
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+    return run
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_scenario(context, name, iterations, alloc_iterations):
+    """
+    Measure one scenario: latency and query count over ``iterations``
+    requests, then peak Python allocations over ``alloc_iterations`` more
+    (tracemalloc slows requests down, so it gets its own pass).
+    """
+    client = Client()
+    send(client, context, name, 0)()  # warm up caches and imports
+    iterations = min(iterations, SLOW_SCENARIOS.get(name, iterations))
+    alloc_iterations = min(alloc_iterations, iterations)
+
+    timings, query_counts, failures = [], [], 0
+    for i in range(iterations):
+        request = send(client, context, name, i)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = request()
+            timings.append(time.perf_counter() - start)
+        query_counts.append(len(queries))
+        failures += response.status_code >= 400
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(alloc_iterations):
+            request = send(client, context, name, iterations + i)
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            request()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+        'queries': max(query_counts),
+        'alloc_peak_kb': round(max(peaks) / 1024, 1) if peaks else None,
+        'failures': failures,
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    Compare two result sets; return ``(name, metric, before, after)`` for
+    every p50 slower by more than ``threshold`` (a fraction) and every
+    query count that grew.
+    """
+    regressions = []
+    for name, after in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if after['p50_ms'] > before['p50_ms'] * (1 + threshold):
+            regressions.append((name, 'p50_ms', before['p50_ms'], after['p50_ms']))
+        if after['queries'] > before['queries']:
+            regressions.append((name, 'queries', before['queries'], after['queries']))
+    return regressions
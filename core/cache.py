@@ -0,0 +1,173 @@
+"""
+Versioned response cache for the core list views.
+
+Cache keys are built from the requesting user, the request path and query
+string, and the current generation of every model the view reads. Writes
+to those models bump the generation (see ``core.signals``), so a cached
+page is never served after the data behind it has changed; the orphaned
+entries simply expire out of Redis. The same key gives the responses'
+ETags, so clients polling with If-None-Match get a 304 until a write.
+
+Generations can also be scoped to one project: a write bumps its model's
+generation and that model's generation in each project it touched, so
+per-project caches (``core.summary``) survive writes to other projects.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+
+from .instrumentation import record_cache
+
+
+GENERATION_KEY = 'core:generation:{}'
+RESPONSE_KEY = 'core:response:{}'
+
+# Per-user responses: browsers may keep them, but must revalidate
+CACHE_CONTROL = 'private, no-cache'
+
+
+def _generation_key(model, scope=None):
+    label = model._meta.label_lower
+    return GENERATION_KEY.format(label if scope is None else f'{label}:{scope}')
+
+
+def _initial_generation():
+    # Counters start at the current time in milliseconds rather than 0, so a
+    # counter that was evicted and re-created can never collide with the
+    # generations of entries that are still cached.
+    return int(time.time() * 1000)
+
+
+def get_generations(models, scope=None):
+    """
+    Return the current generation of each model, creating missing counters.
+    With a ``scope`` (a project id), return the model's generation within
+    that project instead.
+    """
+    keys = [_generation_key(model, scope) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_generation(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+async def aget_generations(models, scope=None):
+    """
+    Async counterpart of ``get_generations``.
+    """
+    keys = [_generation_key(model, scope) for model in models]
+    found = await cache.aget_many(keys)
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, _initial_generation(), timeout=None)
+            found[key] = await cache.aget(key)
+    return [found[key] for key in keys]
+
+
+def _bump(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # No counter yet (or it was evicted): a fresh one is already newer
+        # than anything that could have been cached.
+        cache.add(key, _initial_generation(), timeout=None)
+        return cache.get(key)
+
+
+def bump_generation(model, scopes=()):
+    """
+    Invalidate every cached response that depends on ``model``, and
+    everything cached for the projects in ``scopes``.
+    """
+    for scope in scopes:
+        _bump(_generation_key(model, scope))
+    return _bump(_generation_key(model))
+
+
+def _response_key(request, generations):
+    scope = request.user.pk if request.user.is_authenticated else 'anonymous'
+    query = sorted(request.GET.lists())
+    raw = f'{scope}|{request.path}|{query}|{generations}'
+    return RESPONSE_KEY.format(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def response_cache_key(request, models):
+    return _response_key(request, get_generations(models))
+
+
+async def aresponse_cache_key(request, models):
+    return _response_key(request, await aget_generations(models))
+
+
+def response_etag(request, key, media_type):
+    """
+    Strong ETag for the response cached under ``key``. The key already
+    covers the user, path, query string and model generations; the bytes
+    also depend on the rendered media type and on the host in pagination
+    links.
+    """
+    raw = f'{key}|{media_type}|{request.get_host()}'
+    return f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    """
+    Whether the request's ``If-None-Match`` matches ``etag`` (weak
+    comparison, as RFC 9110 asks for If-None-Match).
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or any(tag.removeprefix('W/') == etag for tag in etags)
+
+
+def versioned_cache(*models, timeout=None):
+    """
+    Cache the data of successful GET responses per user and page, keyed on
+    the generations of ``models``.
+
+    Responses carry an ETag derived from the same key. A request whose
+    ``If-None-Match`` matches gets a 304 straight away: no cache read,
+    queries, pagination count or serialization. Authentication and
+    permissions have run by then.
+
+    Usage::
+
+        @versioned_cache(Task)
+        def get(self, request):
+            ...
+    """
+    # Imported here so that importing this module (the signal handlers do,
+    # at startup) does not load DRF
+    from rest_framework.response import Response
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            key = response_cache_key(request, models)
+            etag = response_etag(request, key, request.accepted_media_type)
+            if etag_matches(request, etag):
+                return Response(status=304, headers={'ETag': etag, 'Cache-Control': CACHE_CONTROL})
+
+            data = cache.get(key)
+            record_cache(data is not None)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = view_method(view, request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, response.data,
+                              timeout if timeout is not None else settings.CORE_CACHE_TIMEOUT)
+            if response.status_code == 200:
+                response['ETag'] = etag
+                response['Cache-Control'] = CACHE_CONTROL
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,145 @@
+"""
+Incremental sync: the ``changes`` feed.
+
+Projects, tasks and milestones carry an indexed ``updated_at``, and every
+delete leaves a ``Tombstone`` (written by the post_delete handlers in
+``core.signals``). A client syncs by sending back the ``next`` token of
+its previous response as ``?since=``, and gets the rows created or updated
+and the ids deleted after it, so the cost of a sync follows the amount of
+churn rather than the size of the tables. Without ``since`` the feed
+starts from the beginning (a full sync).
+
+The token is signed and opaque. It holds one ``(updated_at, id)`` position
+per model, walked as a keyset like ``core.pagination.KeysetPagination``,
+and one ``(deleted_at, id)`` position in the tombstones. Each page returns
+at most ``CORE_SYNC_PAGE_SIZE`` rows per model; ``has_more`` asks the
+client to fetch the next page straight away.
+
+``updated_at`` is set when a row is saved, not when its transaction
+commits, so a slow transaction can commit rows stamped before the
+position a client has already reached. Once a model is caught up its
+position therefore goes back ``CORE_SYNC_OVERLAP`` seconds from the
+current time. Rows in that window can be sent twice; clients apply
+deletions first, then upsert by id.
+
+Tombstones older than ``CORE_TOMBSTONE_DAYS`` are purged daily; a token
+older than that is rejected and the client has to sync from scratch.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Project, Task, Milestone, Tombstone
+from .projections import PROJECT_LIST, TASK_LIST, MILESTONE_LIST
+
+
+# Parents first, so a client inserting in order meets the projects first
+FEEDS = {
+    'projects': (Project, PROJECT_LIST),
+    'tasks': (Task, TASK_LIST),
+    'milestones': (Milestone, MILESTONE_LIST),
+}
+
+SALT = 'core.changes'
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class ExpiredToken(ValueError):
+    pass
+
+
+def after(field, position):
+    """
+    Rows strictly after ``position`` (a ``(timestamp, id)`` pair) in
+    ``(field, id)`` order.
+    """
+    moment, id = position
+    return Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': id})
+
+
+def encode_token(positions):
+    return signing.dumps({key: [moment.isoformat(), id] for key, (moment, id) in positions.items()},
+                         salt=SALT, compress=True)
+
+
+def decode_token(token):
+    """
+    Return the positions held by ``token``. Raises ``InvalidToken`` for a
+    token this server did not issue and ``ExpiredToken`` when the
+    tombstones it needs have been purged.
+    """
+    try:
+        values = signing.loads(token, salt=SALT)
+        positions = {key: (datetime.fromisoformat(values[key][0]), int(values[key][1]))
+                     for key in [*FEEDS, 'deleted']}
+    except (signing.BadSignature, KeyError, IndexError, TypeError, ValueError):
+        raise InvalidToken('Invalid token')
+    if positions['deleted'][0] < timezone.now() - timedelta(days=settings.CORE_TOMBSTONE_DAYS):
+        raise ExpiredToken('Token expired')
+    return positions
+
+
+def changes(token=None, page_size=None):
+    """
+    Return the page of changes after ``token`` (None for a full sync) as
+    the response data of the ``changes`` endpoint.
+    """
+    page_size = page_size or settings.CORE_SYNC_PAGE_SIZE
+    now = timezone.now()
+    caught_up = (now - timedelta(seconds=settings.CORE_SYNC_OVERLAP), 0)
+    positions = decode_token(token) if token else {'deleted': caught_up}
+
+    data = {'changes': {}, 'deleted': {key: [] for key in FEEDS}}
+    has_more = False
+    next_positions = {}
+    for key, (model, projection) in FEEDS.items():
+        queryset = model.objects.all()
+        if positions.get(key):
+            queryset = queryset.filter(after('updated_at', positions[key]))
+        rows = list(projection.values(queryset.order_by('updated_at', 'id'), ordering=('updated_at', 'id'))
+                    [:page_size + 1])
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            has_more = True
+            next_positions[key] = (rows[-1]['updated_at'], rows[-1]['id'])
+        else:
+            next_positions[key] = caught_up
+        data['changes'][key] = projection.render(rows)
+
+    if token:
+        tombstones = list(Tombstone.objects.filter(after('deleted_at', positions['deleted']))
+                          .order_by('deleted_at', 'id').values_list('deleted_at', 'id', 'kind', 'object_id')
+                          [:page_size + 1])
+        if len(tombstones) > page_size:
+            tombstones = tombstones[:page_size]
+            has_more = True
+            next_positions['deleted'] = tombstones[-1][:2]
+        else:
+            next_positions['deleted'] = caught_up
+    else:
+        # A full sync has nothing to delete, but must see what is deleted
+        # while it pages
+        tombstones = []
+        next_positions['deleted'] = positions['deleted']
+
+    kinds = {model._meta.model_name: key for key, (model, _) in FEEDS.items()}
+    for _, _, kind, object_id in tombstones:
+        data['deleted'][kinds[kind]].append(object_id)
+
+    data['next'] = encode_token(next_positions)
+    data['has_more'] = has_more
+    return data
+
+
+def purge_tombstones():
+    """
+    Delete the tombstones no valid token can ask for any more. Run daily.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.CORE_TOMBSTONE_DAYS)
+    return Tombstone.objects.filter(deleted_at__lt=cutoff).delete()[0]
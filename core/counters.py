@@ -0,0 +1,141 @@
+"""
+Denormalized project counters.
+
+``Project.task_count``, ``milestone_count`` and ``next_due_date`` (the
+earliest due date of the project's milestones that is not in the past) let
+dashboards show a project without aggregating over its tasks and
+milestones. They are written in the same transaction as the rows they
+count:
+
+* counts move with ``UPDATE ... SET task_count = task_count + n``, so
+  concurrent writers never lose an increment;
+* a new milestone can only bring ``next_due_date`` forward, which is done
+  with ``LEAST`` on the current value; updates and deletes recompute it
+  from the ``(project, due_date)`` index.
+
+The post_save/post_delete handlers in ``core.signals`` cover single-object
+writes. Batch writes send no per-object signals (or, for queryset deletes,
+are accounted for by the caller), so the batch endpoints call
+``record_saves``/``record_deletes`` themselves. ``refresh_due_dates``
+moves ``next_due_date`` on once a due date has passed, and ``recount``
+rebuilds everything from scratch.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
+
+from .models import Project, Task, Milestone
+
+
+COUNT_FIELDS = {
+    Task: 'task_count',
+    Milestone: 'milestone_count',
+}
+
+
+def adjust_counts(model, deltas):
+    """
+    Add ``deltas`` (``{project id: change}``) to the model's count, with one
+    UPDATE per distinct change.
+    """
+    field = COUNT_FIELDS[model]
+    by_delta = defaultdict(list)
+    for project_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(project_id)
+    for delta, project_ids in by_delta.items():
+        Project.objects.filter(pk__in=project_ids).update(**{field: F(field) + delta})
+
+
+def next_due_date():
+    return Subquery(
+        Milestone.objects.filter(project=OuterRef('pk'), due_date__gte=timezone.localdate())
+        .order_by('due_date').values('due_date')[:1]
+    )
+
+
+def recompute_due_dates(project_ids):
+    if project_ids:
+        Project.objects.filter(pk__in=project_ids).update(next_due_date=next_due_date())
+
+
+def lower_due_date(project_id, due_date):
+    if due_date >= timezone.localdate():
+        Project.objects.filter(pk=project_id).update(
+            next_due_date=Least(Coalesce(F('next_due_date'), Value(due_date)), Value(due_date))
+        )
+
+
+def counted_values(model, instance):
+    """
+    The instance's ``counted_fields`` as their Python types: a DateField
+    accepts an ISO string, which is saved as is and only parsed on load.
+    """
+    return {name: model._meta.get_field(name).to_python(getattr(instance, name))
+            for name in model.counted_fields}
+
+
+def record_saves(model, instances, created):
+    """
+    Update the counters of the projects ``instances`` were saved to (or,
+    for updates, moved from). Returns the ids of those projects.
+    """
+    deltas = Counter()
+    touched = set()
+    projects = set()
+    for instance in instances:
+        saved = {} if created else getattr(instance, '_saved_counted', {})
+        current = counted_values(model, instance)
+        previous = saved.get('project_id')
+        projects.update({instance.project_id, previous} - {None})
+        if created:
+            deltas[instance.project_id] += 1
+        elif previous is not None and previous != instance.project_id:
+            deltas[previous] -= 1
+            deltas[instance.project_id] += 1
+        if created or any(saved.get(name) != value for name, value in current.items()):
+            touched.update({instance.project_id, previous} - {None})
+        instance._saved_counted = current
+    adjust_counts(model, deltas)
+
+    if model is Milestone:
+        if created and len(instances) == 1:
+            lower_due_date(instances[0].project_id, current['due_date'])
+        else:
+            recompute_due_dates(touched)
+    return projects
+
+
+def record_deletes(model, project_ids):
+    """
+    Update the counters after deleting rows of ``model``; ``project_ids``
+    holds the project of every deleted row.
+    """
+    adjust_counts(model, {project_id: -count for project_id, count in Counter(project_ids).items()})
+    if model is Milestone:
+        recompute_due_dates(set(project_ids))
+
+
+def refresh_due_dates():
+    """
+    Recompute ``next_due_date`` where it has passed. Run daily.
+    """
+    return Project.objects.filter(next_due_date__lt=timezone.localdate()).update(next_due_date=next_due_date())
+
+
+def recount(projects=None):
+    """
+    Rebuild all counters of ``projects`` (a queryset, default all) from the
+    task and milestone tables.
+    """
+    projects = Project.objects.all() if projects is None else projects
+
+    def count(model):
+        return Coalesce(Subquery(
+            model.objects.filter(project=OuterRef('pk')).order_by()
+            .values('project').annotate(count=Count('pk')).values('count')
+        ), 0)
+
+    return projects.update(task_count=count(Task), milestone_count=count(Milestone), next_due_date=next_due_date())
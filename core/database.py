@@ -0,0 +1,21 @@
+"""
+Per-connection database setup.
+
+``configure_sqlite`` is connected to ``connection_created`` and applies
+``settings.SQLITE_PRAGMAS`` to every new SQLite connection; other backends
+are left alone. With persistent connections (``CONN_MAX_AGE``) this runs
+once per connection rather than once per request.
+"""
+from django.conf import settings
+
+
+def configure_sqlite(sender=None, connection=None, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            # Names and values come from settings, and PRAGMA takes no
+            # parameters; reject anything that is not a plain word.
+            if not name.isidentifier() or not str(value).isalnum():
+                raise ValueError(f'Invalid SQLite pragma: {name}={value}')
+            cursor.execute(f'PRAGMA {name} = {value}')
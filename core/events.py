@@ -0,0 +1,144 @@
+"""
+Real-time events for the ``eventstream`` Server-Sent Events endpoint.
+
+Task, milestone and notification changes are published from the model
+signal handlers once their transaction commits, and fanned out to every
+open stream through a pluggable backend (``CORE_EVENT_BACKEND``):
+
+* ``InMemoryEventBackend`` delivers within one process, for tests and the
+  development server.
+* ``RedisEventBackend`` goes through Redis pub/sub, so an event published by
+  any web or Celery process reaches streams held by every ASGI worker.
+
+Events are small dicts such as
+``{'type': 'task', 'action': 'updated', 'id': 7, 'project': 3, 'assigned_to': 2}``;
+clients fetch the full object from the regular endpoints when they need it.
+"""
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class InMemoryEventBackend:
+    """
+    Process-local fan-out to asyncio queues.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, events):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            for event in events:
+                # publish() runs in sync code, possibly on another thread
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def subscribe(self):
+        return InMemorySubscription(self)
+
+
+class InMemorySubscription:
+    def __init__(self, backend):
+        self._backend = backend
+        self._entry = (asyncio.get_running_loop(), asyncio.Queue())
+        with backend._lock:
+            backend._subscribers.add(self._entry)
+
+    async def get(self, timeout):
+        """
+        Return the next event, or None if nothing arrived within ``timeout``.
+        """
+        try:
+            return await asyncio.wait_for(self._entry[1].get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        with self._backend._lock:
+            self._backend._subscribers.discard(self._entry)
+
+
+class RedisEventBackend:
+    """
+    Fan-out through a Redis pub/sub channel.
+    """
+    channel = 'core:events'
+
+    def __init__(self):
+        import redis
+        self._client = redis.Redis.from_url(settings.CORE_EVENT_REDIS_URL)
+
+    def publish(self, events):
+        pipe = self._client.pipeline(transaction=False)
+        for event in events:
+            pipe.publish(self.channel, json.dumps(event))
+        pipe.execute()
+
+    def subscribe(self):
+        return RedisSubscription(self.channel)
+
+
+class RedisSubscription:
+    def __init__(self, channel):
+        import redis.asyncio
+        self._client = redis.asyncio.Redis.from_url(settings.CORE_EVENT_REDIS_URL)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._channel = channel
+        self._subscribed = False
+
+    async def get(self, timeout):
+        if not self._subscribed:
+            await self._pubsub.subscribe(self._channel)
+            self._subscribed = True
+        message = await self._pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    async def close(self):
+        await self._pubsub.aclose()
+        await self._client.aclose()
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.CORE_EVENT_BACKEND)()
+    return _backend
+
+
+def publish(events):
+    """
+    Publish ``events`` to every open stream. Delivery is best effort: a
+    broken event channel must never fail the write that produced the event.
+    """
+    if not events:
+        return
+    try:
+        get_backend().publish(events)
+    except Exception as e:
+        print(e)
+
+
+def model_event(instance, action):
+    """
+    Build the event for a saved or deleted task or milestone.
+    """
+    event = {
+        'type': instance._meta.model_name,
+        'action': action,
+        'id': instance.pk,
+        'project': instance.project_id,
+    }
+    if hasattr(instance, 'assigned_to_id'):
+        event['assigned_to'] = instance.assigned_to_id
+    return event
@@ -0,0 +1,73 @@
+"""
+Streaming exports of projects, tasks and milestones.
+
+Rows are read with ``values_list().iterator(chunk_size=...)`` and written
+straight to the response as NDJSON or CSV, so memory use does not depend on
+the table size and no model instances or serializers are built per row.
+Column names match the keys of the API serializers. Under ASGI the lines
+are handed over a chunk at a time through ``core.streaming``, which keeps
+the memory bound there too.
+"""
+import csv
+import json
+
+from django.conf import settings
+
+from .models import Project, Task, Milestone
+
+
+class Export:
+    """
+    What to export for one model: ``columns`` maps output names to the
+    ``values_list`` fields they are read from.
+    """
+
+    def __init__(self, model, columns, date_field=None):
+        self.model = model
+        self.columns = columns
+        self.date_field = date_field
+
+    def rows(self, project=None, date_from=None, date_to=None):
+        queryset = self.model.objects.order_by('id')
+        if project is not None:
+            queryset = queryset.filter(**{'id' if self.model is Project else 'project': project})
+        if self.date_field and date_from:
+            queryset = queryset.filter(**{f'{self.date_field}__gte': date_from})
+        if self.date_field and date_to:
+            queryset = queryset.filter(**{f'{self.date_field}__lte': date_to})
+        fields = list(self.columns.values())
+        return queryset.values_list(*fields).iterator(chunk_size=settings.CORE_EXPORT_CHUNK_SIZE)
+
+    def ndjson(self, rows):
+        names = list(self.columns)
+        for row in rows:
+            values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in row]
+            yield json.dumps(dict(zip(names, values))) + '\n'
+
+    def csv(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(list(self.columns))
+        for row in rows:
+            yield writer.writerow(row)
+
+
+class Echo:
+    """
+    File-like object whose ``write`` returns the value, so ``csv.writer``
+    produces lines we can stream.
+    """
+
+    def write(self, value):
+        return value
+
+
+PROJECTS = Export(Project, {
+    'id': 'id', 'name': 'name', 'description': 'description', 'project_owner': 'project_owner_id',
+})
+TASKS = Export(Task, {
+    'id': 'id', 'name': 'name', 'description': 'description',
+    'project': 'project_id', 'assigned_to': 'assigned_to_id',
+})
+MILESTONES = Export(Milestone, {
+    'id': 'id', 'name': 'name', 'due_date': 'due_date', 'project': 'project_id',
+}, date_field='due_date')
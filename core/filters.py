@@ -0,0 +1,98 @@
+"""
+Server-side filtering and sparse fieldsets for the task and milestone lists.
+
+Query parameters:
+
+* ``project``, ``assigned_to``: one id or a comma-separated list;
+* ``from``, ``to``: inclusive ISO dates on the due date (as the exports);
+* ``search``: case-insensitive substring of the name. A substring match
+  cannot use a B-tree index, so it only narrows rows the other filters
+  (or the ordering) already select through one;
+* ``fields``: comma-separated keys to return. Only those columns are
+  loaded (plus what the pagination orders on) and the serializer drops
+  the other fields.
+
+The parameters are part of the query string, so each combination is
+cached separately by ``versioned_cache``.
+"""
+from datetime import date
+
+from rest_framework.exceptions import ValidationError
+
+from .serializers import TaskSerializer, MilestoneSerializer
+
+
+class ListFilter:
+    """
+    The filters one list endpoint accepts: ``keys`` maps query parameters
+    to foreign key fields, ``date_field`` is the field ``from``/``to``
+    apply to and ``search_field`` the one ``search`` matches.
+    """
+
+    def __init__(self, serializer_class, keys=None, date_field=None, search_field=None):
+        self.serializer_class = serializer_class
+        self.keys = keys or {}
+        self.date_field = date_field
+        self.search_field = search_field
+        self._field_names = None
+
+    @property
+    def field_names(self):
+        if self._field_names is None:
+            self._field_names = list(self.serializer_class().fields)
+        return self._field_names
+
+    def filter_queryset(self, queryset, params):
+        conditions = {}
+        for param, field in self.keys.items():
+            value = params.get(param)
+            if value:
+                try:
+                    conditions[f'{field}__in'] = [int(id) for id in value.split(',')]
+                except ValueError:
+                    raise ValidationError({param: ['Expected an id or a comma-separated list of ids.']})
+        if self.date_field:
+            for param, lookup in (('from', 'gte'), ('to', 'lte')):
+                value = params.get(param)
+                if value:
+                    try:
+                        conditions[f'{self.date_field}__{lookup}'] = date.fromisoformat(value)
+                    except ValueError:
+                        raise ValidationError({param: ['Expected an ISO date (YYYY-MM-DD).']})
+        if self.search_field and params.get('search'):
+            conditions[f'{self.search_field}__icontains'] = params['search']
+        return queryset.filter(**conditions) if conditions else queryset
+
+    def get_fields(self, params):
+        """
+        Return the fields requested with ``?fields=``, or None for all.
+        """
+        value = params.get('fields')
+        if not value:
+            return None
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in self.field_names]
+        if unknown or not fields:
+            raise ValidationError({'fields': [f'Choose from: {", ".join(self.field_names)}.']})
+        return fields
+
+    def apply(self, queryset, request, ordering=('id',)):
+        """
+        Filter ``queryset`` by the request's query parameters and restrict
+        it to the requested fields. Returns ``(queryset, fields)``; pass
+        ``fields`` on to the serializer.
+        """
+        params = request.query_params
+        queryset = self.filter_queryset(queryset, params)
+        fields = self.get_fields(params)
+        if fields is not None:
+            # The keyset cursor reads the ordering columns
+            columns = dict.fromkeys(['id', *fields, *(field.lstrip('-') for field in ordering)])
+            queryset = queryset.only(*columns)
+        return queryset, fields
+
+
+TASK_FILTER = ListFilter(TaskSerializer, keys={'project': 'project', 'assigned_to': 'assigned_to'},
+                         search_field='name')
+MILESTONE_FILTER = ListFilter(MilestoneSerializer, keys={'project': 'project'}, date_field='due_date',
+                              search_field='name')
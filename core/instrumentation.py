@@ -0,0 +1,286 @@
+"""
+Per-request instrumentation.
+
+``InstrumentationMiddleware`` samples a fraction of requests
+(``CORE_METRICS_SAMPLE_RATE``). For a sampled request it records the number
+and duration of SQL queries (through a ``connection.execute_wrapper``), hits
+and misses of the response and role caches, time spent producing
+``serializer.data`` and the total time, then:
+
+* adds a ``Server-Timing`` header, so the breakdown shows up in the
+  browser's network panel or ``curl -I``;
+* feeds per-route histograms exposed in the Prometheus text format by
+  ``MetricsView`` (``/core/metrics``).
+
+Unsampled requests only pay for one random draw; the query wrapper checks a
+context variable and returns straight away. Metrics are aggregated per
+process, so every worker reports its own series with a ``pid`` label.
+"""
+import hmac
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views import View
+
+
+_current = ContextVar('core_request_metrics', default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class RequestMetrics:
+    """
+    What was measured for one sampled request.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.total = 0.0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.serialize_time = 0.0
+
+    def server_timing(self):
+        # Everything not spent in the database or in serializers: auth,
+        # permissions, pagination, rendering, middleware.
+        app = max(self.total - self.db_time - self.serialize_time, 0.0)
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.db_queries} queries"',
+            f'serialize;dur={self.serialize_time * 1000:.2f}',
+            f'app;dur={app * 1000:.2f}',
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"',
+            f'total;dur={self.total * 1000:.2f}',
+        ])
+
+
+def current():
+    """
+    Return the ``RequestMetrics`` of the request being handled, or None if
+    it is not sampled.
+    """
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    """
+    ``connection_created`` receiver: add ``record_query`` to every new
+    database connection, including the ones async views use from worker
+    threads.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_cache(hit):
+    metrics = _current.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+@contextmanager
+def serializing():
+    """
+    Attribute the time spent in the block to serialization.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialize_time += time.perf_counter() - start
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum:.6f}'
+        yield f'{name}_count{{{labels}}} {cumulative}'
+
+
+class Registry:
+    """
+    In-process aggregate of sampled requests, keyed by route and method.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.routes = {}
+
+    def observe(self, route, method, status, metrics):
+        with self._lock:
+            entry = self.routes.get((route, method))
+            if entry is None:
+                entry = self.routes[(route, method)] = {
+                    'duration': Histogram(DURATION_BUCKETS),
+                    'db_duration': Histogram(DURATION_BUCKETS),
+                    'serialize_duration': Histogram(DURATION_BUCKETS),
+                    'db_queries': Histogram(QUERY_BUCKETS),
+                    'cache_hits': 0,
+                    'cache_misses': 0,
+                    'statuses': {},
+                }
+            entry['duration'].observe(metrics.total)
+            entry['db_duration'].observe(metrics.db_time)
+            entry['serialize_duration'].observe(metrics.serialize_time)
+            entry['db_queries'].observe(metrics.db_queries)
+            entry['cache_hits'] += metrics.cache_hits
+            entry['cache_misses'] += metrics.cache_misses
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+
+    def render(self):
+        pid = os.getpid()
+        histograms = [
+            ('duration', 'core_request_duration_seconds', 'Total request time.'),
+            ('db_duration', 'core_request_db_seconds', 'Time spent in SQL queries.'),
+            ('serialize_duration', 'core_request_serialize_seconds', 'Time spent in serializers.'),
+            ('db_queries', 'core_request_db_queries', 'SQL queries per request.'),
+        ]
+        with self._lock:
+            routes = sorted(self.routes.items())
+            lines = []
+            for key, name, help_text in histograms:
+                lines += [f'# HELP {name} {help_text} Sampled requests only.', f'# TYPE {name} histogram']
+                for (route, method), entry in routes:
+                    lines += entry[key].lines(name, f'route="{route}",method="{method}",pid="{pid}"')
+            lines += ['# HELP core_cache_requests_total Response and role cache lookups.',
+                      '# TYPE core_cache_requests_total counter']
+            for (route, method), entry in routes:
+                labels = f'route="{route}",method="{method}",pid="{pid}"'
+                lines.append(f'core_cache_requests_total{{{labels},result="hit"}} {entry["cache_hits"]}')
+                lines.append(f'core_cache_requests_total{{{labels},result="miss"}} {entry["cache_misses"]}')
+            lines += ['# HELP core_requests_sampled_total Sampled requests by status code.',
+                      '# TYPE core_requests_sampled_total counter']
+            for (route, method), entry in routes:
+                for status, count in sorted(entry['statuses'].items()):
+                    lines.append(f'core_requests_sampled_total{{route="{route}",method="{method}",'
+                                 f'pid="{pid}",status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.route or match.view_name
+
+
+class InstrumentationMiddleware:
+    """
+    Measure sampled requests; see the module docstring. Works for both the
+    WSGI and the ASGI handler.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def sampled(self):
+        rate = settings.CORE_METRICS_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        # Streaming responses are measured up to the first byte
+        metrics.total = time.perf_counter() - metrics.start
+        if settings.CORE_METRICS_SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing()
+        registry.observe(route_of(request), request.method, response.status_code, metrics)
+        return response
+
+
+class MetricsView(View):
+    """
+    MetricsView serves the aggregated request metrics of this process in the
+    Prometheus text format. Scrapers authenticate with
+    ``Authorization: Bearer <CORE_METRICS_TOKEN>``; without a token the view
+    is only served when DEBUG is on.
+
+    """
+
+    def get(self, request):
+        token = settings.CORE_METRICS_TOKEN
+        if token:
+            supplied = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+                return HttpResponse(status=401)
+        elif not settings.DEBUG:
+            raise Http404
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
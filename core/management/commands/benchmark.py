@@ -0,0 +1,83 @@
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.benchmarks import SCENARIOS, BenchmarkContext, benchmark_environment, compare, run_scenario, seed
+
+
+class Command(BaseCommand):
+    help = ('Benchmark every core and user endpoint on a throwaway SQLite database with locmem '
+            'cache and eager Celery, and store p50/p99 latency, queries and allocations as JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--projects', type=int, default=50)
+        parser.add_argument('--tasks', type=int, default=5000)
+        parser.add_argument('--milestones', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--alloc-iterations', type=int, default=5)
+        parser.add_argument('--only', nargs='+', choices=sorted(SCENARIOS), metavar='URL_NAME',
+                            help='Run only these scenarios (URL names)')
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--compare', metavar='BASELINE_JSON',
+                            help='Fail if results regressed against this earlier output')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed p50 slowdown as a fraction when comparing (default 0.2)')
+
+    def handle(self, *args, **options):
+        volumes = {name: options[name] for name in ('users', 'projects', 'tasks', 'milestones')}
+        names = options['only'] or sorted(SCENARIOS)
+
+        results = {}
+        # Without this the login scenario would mostly measure 429 responses
+        unthrottled = override_settings(LOGIN_IP_BURST=10 ** 6, LOGIN_USERNAME_BURST=10 ** 6)
+        with benchmark_environment(), unthrottled:
+            users = seed(**volumes)
+            context = BenchmarkContext(users[0])
+            self.stdout.write(f"{'scenario':<22}{'p50 ms':>10}{'p99 ms':>10}{'queries':>9}{'alloc kB':>10}")
+            for name in names:
+                result = run_scenario(context, name, options['iterations'], options['alloc_iterations'])
+                results[name] = result
+                line = (f"{name:<22}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                        f"{result['queries']:>9}{result['alloc_peak_kb'] or 0:>10.1f}")
+                if result['failures']:
+                    line += f"  ({result['failures']} failed requests)"
+                self.stdout.write(line)
+
+        report = {
+            'meta': {
+                'commit': self.git_commit(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'volumes': volumes,
+                'iterations': options['iterations'],
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)['results']
+            regressions = compare(baseline, results, options['threshold'])
+            for name, metric, before, after in regressions:
+                self.stdout.write(self.style.ERROR(f'{name}: {metric} {before} -> {after}'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions'))
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
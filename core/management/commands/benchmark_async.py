@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import asgi_throughput, auth_headers, benchmark_environment, seed, wsgi_throughput
+
+
+ENDPOINTS = [
+    ('project', '/core/project', '/core/asyncproject'),
+    ('taskview', '/core/taskview', '/core/asynctaskview'),
+    ('milestoneview', '/core/milestoneview', '/core/asyncmilestoneview'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Compare requests/sec of the DRF list views under WSGI with their native async '
+            'counterparts under ASGI, on a throwaway database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--tasks', type=int, default=2000)
+        parser.add_argument('--pages', type=int, default=50,
+                            help='Distinct pages requested, i.e. distinct cache entries')
+
+    def handle(self, *args, **options):
+        with benchmark_environment():
+            users = seed(projects=options['tasks'] // 10, tasks=options['tasks'],
+                         milestones=options['tasks'] // 5)
+            headers = auth_headers(users[0])
+
+            self.stdout.write(f"{'endpoint':<16}{'wsgi req/s':>12}{'asgi req/s':>12}")
+            for name, sync_url, async_url in ENDPOINTS:
+                pages = [f'?page={1 + i % options["pages"]}&page_size=3' for i in range(options['requests'])]
+                wsgi = wsgi_throughput([sync_url + page for page in pages], headers, options['concurrency'])
+                asgi = asgi_throughput([async_url + page for page in pages], headers, options['concurrency'])
+                self.stdout.write(f'{name:<16}{wsgi:>12.1f}{asgi:>12.1f}')
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from core.benchmarks import BENCHMARK_PASSWORD, benchmark_environment, login_throughput, percentile, seed
+from user.credentials import hashing_pool
+
+
+class Command(BaseCommand):
+    help = ('Measure logins/sec under contention on a throwaway database: first the hashing '
+            'capacity with many clients, then a login storm from one client against the rate limits.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=settings.LOGIN_HASH_WORKERS,
+                            help='Threads in the password hashing pool')
+        parser.add_argument('--iterations', type=int, default=settings.PASSWORD_PBKDF2_ITERATIONS,
+                            help='PBKDF2 work factor')
+
+    def handle(self, *args, **options):
+        with benchmark_environment(), override_settings(LOGIN_HASH_WORKERS=options['workers'],
+                                                        PASSWORD_PBKDF2_ITERATIONS=options['iterations']):
+            hashing_pool.shutdown()  # pick up the pool size
+            users = seed(users=options['users'], projects=1, tasks=0, milestones=0)
+            User.objects.update(password=make_password(BENCHMARK_PASSWORD))
+            names = [user.username for user in users]
+            requests = options['requests']
+
+            self.stdout.write(f"{'phase':<10}{'logins/s':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+                          f"{'busy':>8}  statuses")
+
+            # Capacity: every attempt from its own address, limits out of the way
+            cache.clear()
+            attempts = [(names[i % len(names)], BENCHMARK_PASSWORD, f'10.0.{i // 250}.{i % 250 + 1}')
+                        for i in range(requests)]
+            with override_settings(LOGIN_USERNAME_BURST=requests, LOGIN_USERNAME_RATE=1000):
+                self.report('capacity', *login_throughput(attempts, options['concurrency']))
+
+            # Storm: one client retrying a few accounts, as a stuck retry loop would
+            cache.clear()
+            attempts = [(names[i % 3], BENCHMARK_PASSWORD, '10.0.0.1') for i in range(requests)]
+            self.report('storm', *login_throughput(attempts, options['concurrency']))
+            hashing_pool.shutdown()
+
+    def report(self, phase, elapsed, statuses, latencies):
+        busy = statuses.pop('busy')
+        codes = ' '.join(f'{code}={count}' for code, count in sorted(statuses.items()))
+        self.stdout.write(f'{phase:<10}{statuses[200] / elapsed:>10.1f}{len(latencies) / elapsed:>10.1f}'
+                          f'{percentile(latencies, 0.5) * 1000:>10.1f}{percentile(latencies, 0.99) * 1000:>10.1f}'
+                          f'{busy:>8}  {codes}')
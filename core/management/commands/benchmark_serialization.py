@@ -0,0 +1,72 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core import projections, queries
+from core.benchmarks import benchmark_environment, seed
+from core.renderers import FastJSONRenderer, orjson
+from core.serializers import ProjectSerializer, TaskSerializer, MilestoneSerializer
+
+
+LISTS = [
+    ('project', queries.PROJECT_LIST, ProjectSerializer, projections.PROJECT_LIST),
+    ('task', queries.TASK_LIST, TaskSerializer, projections.TASK_LIST),
+    ('milestone', queries.MILESTONE_LIST, MilestoneSerializer, projections.MILESTONE_LIST),
+]
+
+
+class Command(BaseCommand):
+    help = ('Time one large list page through the ModelSerializer path (instances, serializer, '
+            'JSONRenderer) and the read-only fast path (values() rows, projection, '
+            'FastJSONRenderer) on a throwaway database, and check both give the same bytes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows per page')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per path; medians are reported')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        self.stdout.write(f"JSON: {'orjson' if orjson else 'json (orjson not installed)'}, {rows} rows per page")
+        self.stdout.write(f"{'list':<11}{'path':<12}{'fetch ms':>10}{'serialize ms':>14}{'render ms':>11}"
+                          f"{'total ms':>10}{'kB':>8}")
+        with benchmark_environment():
+            seed(users=10, projects=rows, tasks=rows, milestones=rows)
+            for name, plan, serializer_class, projection in LISTS:
+                def serializer_path():
+                    instances = list(plan.queryset().order_by('id')[:rows])
+                    yield
+                    data = serializer_class(instances, many=True).data
+                    yield
+                    yield JSONRenderer().render(data)
+
+                def projection_path():
+                    values = list(projection.values(plan.queryset().order_by('id')[:rows]))
+                    yield
+                    data = projection.render(values)
+                    yield
+                    yield FastJSONRenderer().render(data)
+
+                outputs = []
+                for path, run in (('serializer', serializer_path), ('projection', projection_path)):
+                    timings, output = self.measure(run, options['repeat'])
+                    outputs.append(output)
+                    self.stdout.write(f'{name:<11}{path:<12}{timings[0]:>10.1f}{timings[1]:>14.1f}'
+                                      f'{timings[2]:>11.1f}{sum(timings):>10.1f}{len(output) / 1024:>8.0f}')
+                if outputs[0] != outputs[1]:
+                    self.stdout.write(self.style.ERROR(f'{name}: the two paths rendered different JSON'))
+
+    def measure(self, run, repeat):
+        """
+        Run the three-stage generator ``run`` ``repeat`` times; return the
+        median milliseconds of each stage and the rendered output.
+        """
+        stages = [[], [], []]
+        for _ in range(max(repeat, 1)):
+            steps = run()
+            for stage in stages:
+                start = time.perf_counter()
+                output = next(steps)
+                stage.append((time.perf_counter() - start) * 1000)
+        return [statistics.median(stage) for stage in stages], output
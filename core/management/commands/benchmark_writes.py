@@ -0,0 +1,69 @@
+import contextlib
+import io
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+from core.benchmarks import auth_headers, benchmark_environment, percentile, seed, write_throughput
+from core.models import Project
+
+
+# SQLite's defaults, with a new connection for every request
+BASELINE = {
+    'CONN_MAX_AGE': 0,
+    'SQLITE_PRAGMAS': {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'mmap_size': 0, 'busy_timeout': 5000},
+}
+
+
+class Command(BaseCommand):
+    help = ('Measure task writes/sec from parallel TaskCreation requests on a throwaway database '
+            '(a temporary file for SQLite), with SQLite defaults and per-request connections, '
+            'then with the configured DATABASES and SQLITE_PRAGMAS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--projects', type=int, default=10)
+
+    def handle(self, *args, **options):
+        max_age = connection.settings_dict['CONN_MAX_AGE']
+        profiles = [
+            ('baseline', BASELINE),
+            ('configured', {'CONN_MAX_AGE': max_age,
+                            'SQLITE_PRAGMAS': settings.SQLITE_PRAGMAS}),
+        ]
+        self.stdout.write(f'backend: {connection.vendor}, {options["concurrency"]} writers')
+        self.stdout.write(f"{'profile':<12}{'writes/s':>10}{'p50 ms':>10}{'p99 ms':>10}  statuses")
+
+        with benchmark_environment(on_disk=True):
+            try:
+                self.run(profiles, options)
+            finally:
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+
+    def run(self, profiles, options):
+        users = seed(users=options['concurrency'], projects=options['projects'], tasks=0, milestones=0)
+        headers = auth_headers(users[0])
+        projects = list(Project.objects.values_list('id', flat=True))
+
+        for name, profile in profiles:
+            with override_settings(SQLITE_PRAGMAS=profile['SQLITE_PRAGMAS']):
+                # New connections pick up the profile (and journal mode)
+                connections.close_all()
+                connection.settings_dict['CONN_MAX_AGE'] = profile['CONN_MAX_AGE']
+                connection.ensure_connection()
+                payloads = [{'project': projects[i % len(projects)], 'name': f'{name} {i}',
+                             'assigned_to': users[i % len(users)].id}
+                            for i in range(options['requests'])]
+                # The view prints the exception of a failed write
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = write_throughput(payloads, headers, options['concurrency'])
+                self.report(name, *result)
+
+    def report(self, name, elapsed, statuses, latencies):
+        codes = ' '.join(f'{code}={count}' for code, count in sorted(statuses.items()))
+        self.stdout.write(f'{name:<12}{statuses[201] / elapsed:>10.1f}'
+                          f'{percentile(latencies, 0.5) * 1000:>10.1f}{percentile(latencies, 0.99) * 1000:>10.1f}'
+                          f'  {codes}')
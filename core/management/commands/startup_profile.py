@@ -0,0 +1,84 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# What each kind of process does before it can do useful work
+PROFILES = {
+    'setup': 'import django; django.setup()',
+    'web': ('from projectmanagement.wsgi import application\n'
+            'from django.urls import get_resolver; get_resolver().url_patterns'),
+    'celery': ('import django; django.setup()\n'
+               'from projectmanagement.celery import app; app.loader.import_default_modules()'),
+}
+
+SCRIPT = '''
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projectmanagement.settings')
+{code}
+seconds = time.perf_counter() - start
+from django.db import connections
+print(json.dumps({{
+    'seconds': seconds,
+    'modules': len(sys.modules),
+    'db_connections': [alias for alias in connections if connections[alias].connection is not None],
+}}))
+'''
+
+
+class Command(BaseCommand):
+    help = ('Measure cold-start time of a fresh interpreter for django.setup(), a web worker '
+            '(WSGI app and URLconf) and a Celery worker, and list the slowest imports '
+            '(python -X importtime).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('profiles', nargs='*', help=f"Any of {', '.join(PROFILES)} (default: all)")
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per profile; the median is reported')
+        parser.add_argument('--top', type=int, default=15, help='Slowest top-level imports to list (0 for none)')
+
+    def run(self, code, importtime=False):
+        command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', SCRIPT.format(code=code)]
+        env = {**os.environ, 'PYTHONPATH': str(settings.BASE_DIR)}
+        result = subprocess.run(command, capture_output=True, text=True, cwd=settings.BASE_DIR, env=env)
+        if result.returncode:
+            raise CommandError(result.stderr)
+        return json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+    def handle(self, *args, **options):
+        unknown = set(options['profiles']) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profile: {', '.join(sorted(unknown))}")
+
+        for name in options['profiles'] or PROFILES:
+            runs = [self.run(PROFILES[name])[0] for _ in range(max(options['repeat'], 1))]
+            seconds = statistics.median(run['seconds'] for run in runs)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name}: {seconds * 1000:.0f} ms, {runs[0]['modules']} modules"))
+            if runs[0]['db_connections']:
+                self.stdout.write(self.style.WARNING(
+                    f"  opened database connections: {', '.join(runs[0]['db_connections'])}"))
+
+            if options['top']:
+                _, report = self.run(PROFILES[name], importtime=True)
+                self.stdout.write(f"  {'cumulative ms':>14}  {'self ms':>8}  top-level import")
+                for cumulative, own, module in self.top_level_imports(report)[:options['top']]:
+                    self.stdout.write(f'  {cumulative / 1000:>14.1f}  {own / 1000:>8.1f}  {module}')
+
+    @staticmethod
+    def top_level_imports(report):
+        # Lines look like "import time:   self [us] | cumulative | module",
+        # nested imports being indented under the module that pulled them in
+        imports = []
+        for line in report.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            own, cumulative, module = line[len('import time:'):].split('|')
+            if not module.startswith('  '):
+                imports.append((int(cumulative), int(own), module.strip()))
+        return sorted(imports, reverse=True)
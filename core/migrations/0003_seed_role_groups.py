@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+ROLES = ['admin', 'manager', 'member']
+
+
+def seed_role_groups(apps, schema_editor):
+    Group = apps.get_model('auth', 'Group')
+    for name in ROLES:
+        Group.objects.get_or_create(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_notification_inbox'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_role_groups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def backfill_counters(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    Task = apps.get_model('core', 'Task')
+    Milestone = apps.get_model('core', 'Milestone')
+
+    def count(model):
+        return Coalesce(Subquery(
+            model.objects.filter(project=OuterRef('pk')).order_by()
+            .values('project').annotate(count=Count('pk')).values('count')
+        ), 0)
+
+    Project.objects.update(
+        task_count=count(Task),
+        milestone_count=count(Milestone),
+        next_due_date=Subquery(
+            Milestone.objects.filter(project=OuterRef('pk'), due_date__gte=timezone.localdate())
+            .order_by('due_date').values('due_date')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_seed_role_groups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='milestone_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='next_due_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='task_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='milestone',
+            index=models.Index(fields=['due_date'], name='milestone_due_date'),
+        ),
+        migrations.AddIndex(
+            model_name='milestone',
+            index=models.Index(fields=['project', 'due_date'], name='milestone_project_due'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'project'], name='task_assigned_project'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import Group
 from django.contrib.auth.models import AbstractUser, User
+from .roles import invalidate_roles, role_registry
 
 
 ROLE_CHOICES = [
@@ -17,45 +18,183 @@ class ProjectUser(models.Model):
     def __str__(self):
         return self.user.username
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_role = instance.__dict__.get('role')
+        return instance
+
     def save(self, *args, **kwargs):
+        previous = getattr(self, '_saved_role', None)
         super().save(*args, **kwargs)
-        # Add user to the appropriate group based on the role
-        group, created = Group.objects.get_or_create(name=self.role)
-        self.user.groups.add(group)
+        if self.role == previous:
+            return
+        # Move the user from the old role's group to the new one
+        memberships = User.groups.through.objects
+        if previous and not ProjectUser.objects.filter(user_id=self.user_id, role=previous).exclude(pk=self.pk).exists():
+            memberships.filter(user_id=self.user_id, group_id=role_registry.group_id(previous)).delete()
+        memberships.bulk_create(
+            [User.groups.through(user_id=self.user_id, group_id=role_registry.group_id(self.role))],
+            ignore_conflicts=True,
+        )
+        self._saved_role = self.role
+        # Once the new role is visible, or a concurrent request could cache
+        # the old one again
+        user_id = self.user_id
+        transaction.on_commit(lambda: invalidate_roles(user_id))
+
+
+class TrackedQuerySet(models.QuerySet):
+    """
+    Queryset of the models the changes feed and the project counters track.
+    Its deletes go through ``core.signals.delete_batch``, so the deleted
+    rows are accounted for once per delete rather than once per row.
+    """
+
+    def delete(self):
+        return self.delete_batch()[0]
+
+    def delete_batch(self):
+        """
+        Like ``delete()``, but return ``(delete() result, {pk: deleted
+        instance})``.
+        """
+        from .signals import delete_batch
+        return delete_batch(self, super().delete)
 
 
 class Project(models.Model):
     name = models.CharField(max_length=40,null=True,blank=True)
     description = models.TextField(blank=True,null=True,max_length=200)
     project_owner = models.ForeignKey(ProjectUser,on_delete=models.CASCADE)
+    # Denormalized, maintained by core.counters
+    task_count = models.IntegerField(default=0, editable=False)
+    milestone_count = models.IntegerField(default=0, editable=False)
+    next_due_date = models.DateField(null=True, blank=True, editable=False)
+    # Read by the changes feed (core/changes.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TrackedQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('task_count', 'milestone_count', 'next_due_date')
+
+    class Meta:
+        indexes = [
+            # The changes feed walks (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='project_updated'),
+        ]
 
     def __str__(self):
         return self.name
-    
-    
-class Task(models.Model):
+
+    def save(self, *args, **kwargs):
+        # The counters are only written with UPDATE ... F(); saving a loaded
+        # project must not put back the values it was read with.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.COUNTER_FIELDS]
+        super().save(*args, **kwargs)
+
+
+class ProjectChild(models.Model):
+    """
+    Base of the models counted on their project. Remembers the values of
+    ``counted_fields`` an instance was loaded with, so core.counters can
+    tell when it moves to another project or changes due date.
+    """
+    counted_fields = ('project_id',)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_counted = {name: instance.__dict__.get(name) for name in cls.counted_fields}
+        return instance
+
+
+class Task(ProjectChild):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     name = models.CharField(max_length=100,null=True,blank=True)
     description = models.TextField(max_length=200,null=True,blank=True)
     assigned_to = models.ForeignKey(User,on_delete=models.SET_NULL, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TrackedQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The changes feed walks (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='task_updated'),
+            # A user's tasks, optionally within one project
+            models.Index(fields=['assigned_to', 'project'], name='task_assigned_project'),
+            # ?project= and ?assigned_to= on the task list, in its id order
+            models.Index(fields=['project', 'id'], name='task_project_id'),
+            models.Index(fields=['assigned_to', 'id'], name='task_assigned_id'),
+            # Tasks per assignee in the project summary, from the index alone
+            models.Index(fields=['project', 'assigned_to'], name='task_project_assigned'),
+        ]
 
     def __str__(self):
         return self.project
 
 
-class Milestone(models.Model):
+class Milestone(ProjectChild):
     project = models.ForeignKey(Project, on_delete=models.CASCADE)
     name = models.CharField(max_length=100,null=True,blank=True)
     due_date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TrackedQuerySet.as_manager()
+
+    counted_fields = ('project_id', 'due_date')
+
+    class Meta:
+        indexes = [
+            # The changes feed walks (updated_at, id)
+            models.Index(fields=['updated_at', 'id'], name='milestone_updated'),
+            # Due-date ranges across projects
+            models.Index(fields=['due_date'], name='milestone_due_date'),
+            # A project's milestones by due date, and its next due date
+            models.Index(fields=['project', 'due_date'], name='milestone_project_due'),
+        ]
 
     def __str__(self):
         return self.project
 
 
+class Tombstone(models.Model):
+    """
+    A deleted project, task or milestone, kept for the changes feed until
+    ``CORE_TOMBSTONE_DAYS`` have passed.
+    """
+    kind = models.CharField(max_length=20)  # the model name, e.g. 'task'
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind}:{self.object_id}'
+
+
 class Notification(models.Model):
     user = models.ForeignKey(User,on_delete=models.CASCADE)
     message = models.TextField(max_length=200,null=True,blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    is_read = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Inbox pages: a user's notifications, newest first
+            models.Index(fields=['user', 'created_at'], name='notification_user_created'),
+            # Unread count when the cached counter is missing
+            models.Index(fields=['user', 'is_read'], name='notification_user_read'),
+        ]
 
     def __str__(self):
         return self.user
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""
+Notification delivery: inbox rows plus coalesced email digests.
+
+Every recorded event is written to the ``Notification`` inbox of each
+recipient with one ``bulk_create``, and the per-user unread counter kept in
+the cache is bumped, so inbox polling never has to count rows.
+
+For email, instead of one Celery message and one SMTP session per saved
+object, events are buffered in the shared cache per time window. Within a
+window repeated events about the same object for the same recipient
+collapse into the latest one. The first event of a window schedules a single
+``flush_notifications`` job for the end of the window, which sends one
+digest per recipient over one mail connection.
+
+Cache layout for window ``w``::
+
+    core:notify:w:count         number of registered slots (atomic incr)
+    core:notify:w:slot:<n>      key of the event registered in slot n
+    core:notify:w:event:<...>   the event, one per (recipient, object)
+    core:notify:w:scheduled     set once the flush job is queued
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+
+from .events import publish as publish_events
+from .models import Notification
+
+
+KEY = 'core:notify:{}:{}'
+UNREAD_KEY = 'core:unread:{}'
+
+
+def current_window():
+    return int(time.time() // settings.NOTIFICATION_DIGEST_WINDOW)
+
+
+def _timeout():
+    # Long enough to survive until the flush, short enough to clean up
+    # after a lost flush job.
+    return settings.NOTIFICATION_DIGEST_WINDOW * 4 + 60
+
+
+def record(events):
+    """
+    Store ``events``, an iterable of ``(object_key, subject, message,
+    recipients)`` tuples where ``object_key`` identifies the object the event
+    is about (e.g. ``'core.task:42'``) and ``recipients`` are users.
+    """
+    events = list(events)
+    write_inbox(events)
+
+    window = current_window()
+    timeout = _timeout()
+
+    new_keys = []
+    for object_key, subject, message, recipients in events:
+        for user in recipients:
+            if not user.email:
+                continue
+            key = KEY.format(window, f'event:{user.email}:{object_key}')
+            event = {'recipient': user.email, 'subject': subject, 'message': message}
+            if cache.add(key, event, timeout):
+                new_keys.append(key)
+            else:
+                cache.set(key, event, timeout)  # same object again: keep the latest
+    if not new_keys:
+        return
+
+    count_key = KEY.format(window, 'count')
+    cache.add(count_key, 0, timeout)
+    last = cache.incr(count_key, len(new_keys))
+    first = last - len(new_keys) + 1
+    cache.set_many({KEY.format(window, f'slot:{slot}'): key
+                    for slot, key in zip(range(first, last + 1), new_keys)}, timeout)
+
+    if cache.add(KEY.format(window, 'scheduled'), True, timeout):
+        from .tasks import flush_notifications
+        window_end = (window + 1) * settings.NOTIFICATION_DIGEST_WINDOW
+        countdown = max(window_end - time.time(), 0) + settings.NOTIFICATION_DIGEST_GRACE
+        flush_notifications.apply_async(args=[window], countdown=countdown)
+
+
+def write_inbox(events):
+    rows = [Notification(user=user, message=f'{subject}\n{message}')
+            for object_key, subject, message, recipients in events
+            for user in recipients]
+    Notification.objects.bulk_create(rows)
+    publish_events([{'type': 'notification', 'action': 'created', 'id': row.pk, 'user': row.user_id}
+                    for row in rows])
+
+    per_user = {}
+    for row in rows:
+        per_user[row.user_id] = per_user.get(row.user_id, 0) + 1
+    for user_id, count in per_user.items():
+        adjust_unread(user_id, count)
+
+
+def adjust_unread(user_id, delta):
+    # A missing counter is rebuilt from the table on the next read
+    try:
+        cache.incr(UNREAD_KEY.format(user_id), delta)
+    except ValueError:
+        pass
+
+
+def unread_count(user_id):
+    """
+    Number of unread notifications of ``user_id``, answered from the cached
+    counter; only a cold counter is rebuilt with an indexed count.
+    """
+    key = UNREAD_KEY.format(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user=user_id, is_read=False).count()
+        cache.add(key, count, settings.NOTIFICATION_UNREAD_TTL)
+    return max(count, 0)
+
+
+def mark_read(user_id, ids=None):
+    """
+    Mark the given notifications (or all of them) of ``user_id`` as read and
+    return how many changed.
+    """
+    notifications = Notification.objects.filter(user=user_id, is_read=False)
+    if ids is not None:
+        notifications = notifications.filter(id__in=ids)
+    updated = notifications.update(is_read=True)
+    if updated:
+        try:
+            cache.decr(UNREAD_KEY.format(user_id), updated)
+        except ValueError:
+            pass
+    return updated
+
+
+def build_digest(recipient, events):
+    if len(events) == 1:
+        subject, body = events[0]['subject'], events[0]['message']
+    else:
+        subject = f'{len(events)} updates in your projects'
+        body = '\n\n'.join(f"{event['subject']}\n{event['message']}" for event in events)
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient])
+
+
+def flush(window):
+    """
+    Send one digest per recipient for everything buffered in ``window`` and
+    drop the window's keys. Returns the number of messages sent.
+    """
+    count_key = KEY.format(window, 'count')
+    count = cache.get(count_key) or 0
+    slot_keys = [KEY.format(window, f'slot:{slot}') for slot in range(1, count + 1)]
+    event_keys = list(dict.fromkeys(cache.get_many(slot_keys).values()))
+    events = cache.get_many(event_keys)
+
+    by_recipient = {}
+    for key in event_keys:
+        if key in events:
+            by_recipient.setdefault(events[key]['recipient'], []).append(events[key])
+
+    sent = 0
+    if by_recipient:
+        messages = [build_digest(recipient, recipient_events)
+                    for recipient, recipient_events in by_recipient.items()]
+        sent = get_connection().send_messages(messages) or 0
+
+    cache.delete_many([count_key, KEY.format(window, 'scheduled'), *slot_keys, *event_keys])
+    return sent
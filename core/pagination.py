@@ -0,0 +1,185 @@
+"""
+Pagination classes for the core list views.
+
+Page-number pagination stays the default for existing clients. Clients
+that walk deep into a list can opt into keyset (cursor) pagination with
+``?pagination=cursor``: each page is a single indexed range query on the
+view's ordering, with no ``COUNT(*)`` and no ``OFFSET``. The ``next`` link
+carries a signed, opaque cursor holding the ordering values of the last
+row served.
+"""
+from django.conf import settings
+from django.core import signing
+from django.core.paginator import InvalidPage, Page
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    PageNumberPagination with an ``apaginate_queryset`` for async views: the
+    count runs through ``acount()`` and the page through async iteration.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()  # primes the cached property
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+
+        bottom = (number - 1) * page_size
+        rows = [row async for row in queryset[bottom:bottom + page_size]]
+        self.page = Page(rows, number, paginator)
+        self.request = request
+        return rows
+
+
+class CustomPageNumberPagination(AsyncPageNumberPagination): # for pagination
+    page_size = 3
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class ListPageNumberPagination(AsyncPageNumberPagination):
+    page_size = 10
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique ``ordering``, e.g. ``('id',)`` or
+    ``('due_date', 'id')``. Prefix a field with ``-`` to walk it descending.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    salt = 'core.pagination.cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=('id',), page_size=None):
+        self.ordering = tuple(ordering)
+        if page_size is not None:
+            self.page_size = page_size
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        window = self.get_window(queryset, request)
+        return self.finish_page(list(window))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        window = self.get_window(queryset, request)
+        return self.finish_page([row async for row in window])
+
+    def get_window(self, queryset, request):
+        self.request = request
+        self.model = queryset.model
+        self.page_size_used = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        # Fetch one extra row to learn whether there is a next page
+        return queryset[:self.page_size_used + 1]
+
+    def finish_page(self, rows):
+        self.has_next = len(rows) > self.page_size_used
+        rows = rows[:self.page_size_used]
+        self.next_position = self.position_of(rows[-1]) if self.has_next else None
+        return rows
+
+    def after(self, position):
+        """
+        Build the row-value comparison ``(f1, f2, ...) > (v1, v2, ...)`` as
+        ``f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...``.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def position_of(self, row):
+        # Model instances, or values() rows from the list fast path
+        if isinstance(row, dict):
+            return [row[field.lstrip('-')] for field in self.ordering]
+        return [getattr(row, field.lstrip('-')) for field in self.ordering]
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value
+                  for value in position]
+        return signing.dumps(values, salt=self.salt, compress=True)
+
+    def decode_cursor(self, request):
+        token = request.GET.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            values = signing.loads(token, salt=self.salt)
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [self.model._meta.get_field(field.lstrip('-')).to_python(value)
+                    for field, value in zip(self.ordering, values)]
+        except (signing.BadSignature, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+def uses_keyset(request):
+    """
+    Decide the pagination mode: an explicit ``?pagination=`` wins, then a
+    ``cursor`` or ``page`` parameter, then ``CORE_PAGINATION_MODE``.
+    """
+    mode = request.GET.get('pagination')
+    if mode:
+        return mode == 'cursor'
+    if 'cursor' in request.GET:
+        return True
+    if 'page' in request.GET:
+        return False
+    return settings.CORE_PAGINATION_MODE == 'cursor'
+
+
+def get_paginator(request, page_number_class, ordering=('id',)):
+    """
+    Return the paginator for this request: ``page_number_class`` for
+    page-number clients, or a ``KeysetPagination`` over ``ordering``.
+    """
+    if uses_keyset(request):
+        return KeysetPagination(ordering=ordering,
+                                page_size=page_number_class.page_size)
+    return page_number_class()
@@ -0,0 +1,111 @@
+"""
+Read-only fast path for the list endpoints.
+
+A ``Projection`` renders the output of a ``ModelSerializer`` straight from
+``values()`` rows. The serializer's fields are compiled once into a map of
+``(key, column, converter)``: related fields read the ``<name>_id`` column
+(the primary key the serializer would render), and each remaining field
+gets a converter with the same result as its ``to_representation``. No
+model instances, field binding or related-object lookups happen per row,
+and the output is the same dicts, in the same key order, so rendered JSON
+is byte-identical (``core.tests`` checks it).
+
+``PROJECT_LIST``, ``TASK_LIST`` and ``MILESTONE_LIST`` mirror the query
+plans of the same names in ``core.queries``. Serializers with fields this
+cannot compile (nested serializers, method
+fields, dotted sources) raise ``ImproperlyConfigured`` on first use.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .instrumentation import serializing
+from .serializers import ProjectSerializer, TaskSerializer, MilestoneSerializer
+
+
+def _date(value):
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def _converter(field):
+    """
+    Return a function equivalent to ``field.to_representation`` for a
+    column value, or None when the value is used as is.
+    """
+    if type(field) is serializers.CharField:
+        return str
+    if type(field) is serializers.IntegerField:
+        return int
+    if type(field) is serializers.DateField:
+        output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+        if output_format is None:
+            return None
+        if output_format.lower() == ISO_8601:
+            return _date
+    return field.to_representation
+
+
+class Projection:
+    """
+    Renders ``serializer_class`` output from ``values()`` rows. Use
+    ``columns(fields)`` for the ``values()`` call and ``render(rows,
+    fields)`` for the data; ``fields`` is an optional sparse fieldset.
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._compiled = None
+
+    def compile(self):
+        if self._compiled is None:
+            model = self.serializer_class.Meta.model
+            compiled = []
+            for name, field in self.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                if '.' in field.source or field.source == '*':
+                    raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{name} cannot be projected')
+                if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+                    compiled.append((name, model._meta.get_field(field.source).attname, None))
+                elif isinstance(field, (serializers.RelatedField, serializers.BaseSerializer,
+                                        serializers.SerializerMethodField)):
+                    raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{name} cannot be projected')
+                else:
+                    model._meta.get_field(field.source)
+                    compiled.append((name, field.source, _converter(field)))
+            self._compiled = compiled
+        return self._compiled
+
+    def field_map(self, fields=None):
+        compiled = self.compile()
+        if fields is None:
+            return compiled
+        return [entry for entry in compiled if entry[0] in fields]
+
+    def columns(self, fields=None):
+        return [column for _, column, _ in self.field_map(fields)]
+
+    def values(self, queryset, fields=None, ordering=('id',)):
+        """
+        ``queryset.values()`` with the columns ``render`` needs, plus the
+        ordering columns the keyset cursor reads.
+        """
+        columns = dict.fromkeys([*self.columns(fields), *(field.lstrip('-') for field in ordering)])
+        return queryset.values(*columns)
+
+    def render(self, rows, fields=None):
+        field_map = self.field_map(fields)
+        with serializing():
+            data = []
+            for row in rows:
+                item = {}
+                for key, column, convert in field_map:
+                    value = row[column]
+                    item[key] = value if value is None or convert is None else convert(value)
+                data.append(item)
+        return data
+
+
+PROJECT_LIST = Projection(ProjectSerializer)
+TASK_LIST = Projection(TaskSerializer)
+MILESTONE_LIST = Projection(MilestoneSerializer)
@@ -0,0 +1,42 @@
+"""
+Query plans for the core views.
+
+Each plan declares up front which relations a code path joins in
+(``select_related``) and, for read-only paths, which columns it loads
+(``only``), so serializers and signal handlers never trigger lazy
+per-row foreign key fetches. ``core.tests`` asserts that the list
+endpoints run the same number of queries whatever the page size.
+"""
+from .models import Project, Task, Milestone
+
+
+class QueryPlan:
+    """
+    A model plus the joins and columns one code path needs.
+
+    Leave ``only`` empty for plans whose instances get saved: a deferred
+    instance only writes back the fields it loaded.
+    """
+
+    def __init__(self, model, select_related=(), only=()):
+        self.model = model
+        self.select_related = tuple(select_related)
+        self.only = tuple(only)
+
+    def queryset(self):
+        queryset = self.model._default_manager.all()
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.only:
+            queryset = queryset.only(*self.only)
+        return queryset
+
+
+# List endpoints: serializers render foreign keys as ids, so no joins
+PROJECT_LIST = QueryPlan(Project, only=('id', 'name', 'description', 'project_owner_id', 'updated_at'))
+TASK_LIST = QueryPlan(Task, only=('id', 'project_id', 'name', 'description', 'assigned_to_id', 'updated_at'))
+MILESTONE_LIST = QueryPlan(Milestone, only=('id', 'project_id', 'name', 'due_date', 'updated_at'))
+
+# Update endpoints: join what the post_save notification reads
+TASK_WRITE = QueryPlan(Task, select_related=('project', 'assigned_to'))
+MILESTONE_WRITE = QueryPlan(Milestone, select_related=('project__project_owner__user',))
@@ -0,0 +1,33 @@
+"""
+JSON renderer backed by orjson when it is installed.
+
+``FastJSONRenderer`` produces the same bytes as DRF's ``JSONRenderer`` with
+the default settings: compact separators, UTF-8 output, U+2028/U+2029
+escaped, dates and other non-JSON types converted by DRF's encoder. It
+falls back to ``JSONRenderer`` for indented output, non-default
+``UNICODE_JSON``/``COMPACT_JSON`` settings, and anything orjson rejects
+(such as integers over 64 bits). Floats are the one difference: orjson
+writes large exponents as ``1e16`` where ``json`` writes ``1e+16``, and
+non-finite values as ``null``; none of the API's serializers emit floats.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default,
+                               option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # As JSONRenderer: these are valid JSON but not valid JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,197 @@
+"""
+Role resolution for the permission classes in ``core.permissions``.
+
+A user's group names are loaded at most once per request and kept in a
+two-level cache: a small in-process LRU with a short TTL in front of the
+shared Django cache (Redis). ``ProjectUser.save`` and changes to
+``User.groups`` invalidate both levels; other processes pick the change up
+once their local entry expires.
+
+Requests authenticated with a stateless access token (see
+``core.authentication``) take their roles from the token claims instead.
+
+``role_registry`` maps the role names to their ``Group`` ids, resolved once
+per process; the groups themselves are seeded by a data migration.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+
+from .instrumentation import record_cache
+
+
+ROLE_NAMES = ('admin', 'manager', 'member')
+
+ROLES_KEY = 'core:roles:{}'
+TOKEN_GENERATION_KEY = 'core:tokengen:{}'
+
+
+class RoleCache:
+    """
+    Local LRU of ``user id -> frozenset of group names`` backed by the
+    shared cache, with hit/miss counters for each level.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    def _get_local(self, user_id, now):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.stats['local_hits'] += 1
+                record_cache(True)
+                return entry[1]
+        return None
+
+    def get(self, user_id):
+        now = time.monotonic()
+        roles = self._get_local(user_id, now)
+        if roles is not None:
+            return roles
+
+        roles = cache.get(ROLES_KEY.format(user_id))
+        record_cache(roles is not None)
+        if roles is not None:
+            self.stats['shared_hits'] += 1
+        else:
+            self.stats['misses'] += 1
+            roles = frozenset(
+                Group.objects.filter(user=user_id).values_list('name', flat=True)
+            )
+            cache.set(ROLES_KEY.format(user_id), roles, settings.CORE_ROLE_CACHE_TTL)
+        self._store(user_id, roles, now)
+        return roles
+
+    async def aget(self, user_id):
+        """
+        Async counterpart of ``get`` for views running in the event loop.
+        """
+        now = time.monotonic()
+        roles = self._get_local(user_id, now)
+        if roles is not None:
+            return roles
+
+        roles = await cache.aget(ROLES_KEY.format(user_id))
+        record_cache(roles is not None)
+        if roles is not None:
+            self.stats['shared_hits'] += 1
+        else:
+            self.stats['misses'] += 1
+            roles = frozenset([
+                name async for name in
+                Group.objects.filter(user=user_id).values_list('name', flat=True)
+            ])
+            await cache.aset(ROLES_KEY.format(user_id), roles, settings.CORE_ROLE_CACHE_TTL)
+        self._store(user_id, roles, now)
+        return roles
+
+    def _store(self, user_id, roles, now):
+        with self._lock:
+            self._entries[user_id] = (now + settings.CORE_ROLE_CACHE_LOCAL_TTL, roles)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > settings.CORE_ROLE_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+        cache.delete(ROLES_KEY.format(user_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for name in self.stats:
+                self.stats[name] = 0
+
+    def hit_rate(self):
+        """
+        Fraction of lookups answered without a database query.
+        """
+        hits = self.stats['local_hits'] + self.stats['shared_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+
+
+role_cache = RoleCache()
+
+
+class RoleRegistry:
+    """
+    ``role name -> Group id`` for the role groups, loaded with one query on
+    first use. Groups missing from the database (e.g. before the seeding
+    migration has run) are created.
+    """
+
+    def __init__(self):
+        self._ids = None
+        self._lock = threading.Lock()
+
+    def group_ids(self):
+        ids = self._ids
+        if ids is None:
+            with self._lock:
+                if self._ids is None:
+                    found = dict(Group.objects.filter(name__in=ROLE_NAMES).values_list('name', 'id'))
+                    for name in ROLE_NAMES:
+                        if name not in found:
+                            found[name] = Group.objects.get_or_create(name=name)[0].id
+                    self._ids = found
+                ids = self._ids
+        return ids
+
+    def group_id(self, role):
+        return self.group_ids()[role]
+
+    def clear(self):
+        with self._lock:
+            self._ids = None
+
+
+role_registry = RoleRegistry()
+
+
+def get_roles(request):
+    """
+    Return the group names of ``request.user``, memoized on the request so
+    stacked permission classes share a single lookup.
+    """
+    roles = getattr(request, '_core_roles', None)
+    if roles is None:
+        user = request.user
+        if getattr(user, 'claimed_roles', None) is not None:
+            # Stateless token user: the roles were checked when the token was
+            # issued and its generation is still current
+            roles = user.claimed_roles
+        elif user and user.is_authenticated:
+            roles = role_cache.get(user.pk)
+        else:
+            roles = frozenset()
+        request._core_roles = roles
+    return roles
+
+
+def has_role(request, role):
+    return role in get_roles(request)
+
+
+def invalidate_roles(user_id):
+    role_cache.invalidate(user_id)
+    # Access tokens carry the roles they were issued with
+    invalidate_token_generation(user_id)
+
+
+def invalidate_token_generation(user_id):
+    """
+    Drop the cached token generation of a user (see
+    ``core.authentication``), so it is recomputed from the current password,
+    active flag and roles.
+    """
+    cache.delete(TOKEN_GENERATION_KEY.format(user_id))
@@ -0,0 +1,40 @@
+"""
+Lazily imported views for the URLconfs.
+
+Loading a URLconf (which ``manage.py`` system checks, ``reverse()`` and the
+first request all do) would otherwise import every view module and the
+whole DRF stack behind them. ``lazy_view`` defers that import to the first
+request the view actually serves.
+"""
+from asgiref.sync import markcoroutinefunction
+from django.utils.module_loading import import_string
+
+
+def lazy_view(path, is_async=False, csrf_exempt=True):
+    """
+    Return a view that imports the class-based view at ``path`` on first
+    use. Django decides how to call a view before it is imported, so async
+    views must say ``is_async=True``; ``csrf_exempt`` mirrors what
+    ``APIView.as_view()`` sets (pass False for plain Django views).
+    """
+    module_name, _, class_name = path.rpartition('.')
+    view = None
+
+    def load():
+        nonlocal view
+        if view is None:
+            view = import_string(path).as_view()
+        return view
+
+    if is_async:
+        async def dispatch(request, *args, **kwargs):
+            return await load()(request, *args, **kwargs)
+        markcoroutinefunction(dispatch)
+    else:
+        def dispatch(request, *args, **kwargs):
+            return load()(request, *args, **kwargs)
+
+    dispatch.__module__ = module_name
+    dispatch.__name__ = dispatch.__qualname__ = class_name
+    dispatch.csrf_exempt = csrf_exempt
+    return dispatch
@@ -1,27 +1,201 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.contrib.auth.models import User
 from rest_framework import serializers
-from .models import *
+from .instrumentation import serializing
+from .models import ProjectUser, Project, Task, Milestone, Notification
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class TimedSerializerMixin:
+    """
+    Count the time spent producing ``.data`` as serialization in the
+    request metrics (see ``core.instrumentation``).
+    """
+
+    @property
+    def data(self):
+        with serializing():
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class SparseFieldsMixin:
+    """
+    Accept ``fields=[...]`` to serialize only those fields (``?fields=`` on
+    the list endpoints, see ``core.filters``).
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def resolve_related_keys(serializer, items):
+    """
+    Fetch every object referenced by the ``ResolvedPrimaryKeyRelatedField``s
+    of ``serializer`` across all ``items`` with one ``in_bulk()`` per
+    queryset (fields reading the same queryset share it). Returns
+    ``(resolved, missing)``: ``{field_name: {pk: object}}`` and
+    ``{field_name: [ids not found]}`` for the fields with missing ids.
+    """
+    requested = {}
+    for name, field in serializer.fields.items():
+        if not isinstance(field, ResolvedPrimaryKeyRelatedField) or field.read_only:
+            continue
+        pk_field = field.get_queryset().model._meta.pk
+        ids = set()
+        for item in items:
+            if not isinstance(item, dict) or item.get(name) in (None, ''):
+                continue
+            try:
+                ids.add(pk_field.to_python(item[name]))
+            except (DjangoValidationError, TypeError):
+                continue  # reported by the field itself
+        requested[name] = (field.get_queryset(), ids)
+
+    by_queryset = {}
+    for queryset, ids in requested.values():
+        key = (queryset.model, str(queryset.query))
+        by_queryset.setdefault(key, (queryset, set()))[1].update(ids)
+    fetched = {key: queryset.in_bulk(ids) if ids else {} for key, (queryset, ids) in by_queryset.items()}
+
+    resolved, missing = {}, {}
+    for name, (queryset, ids) in requested.items():
+        resolved[name] = fetched[(queryset.model, str(queryset.query))]
+        if ids - resolved[name].keys():
+            missing[name] = sorted(ids - resolved[name].keys())
+    return resolved, missing
+
+
+class ResolvedKeysMixin:
+    """
+    For ModelSerializers with ``ResolvedPrimaryKeyRelatedField``s: resolve
+    the related keys of a single object the same way ``BulkListSerializer``
+    does for a list, and expose the ids that were not found as
+    ``missing_keys``.
+    """
+
+    def to_internal_value(self, data):
+        if self.parent is None and 'resolved_keys' not in self._context:
+            self._context['resolved_keys'], self._context['missing_keys'] = resolve_related_keys(self, [data])
+        return super().to_internal_value(data)
+
+    @property
+    def missing_keys(self):
+        return self.context.get('missing_keys', {})
+
+
+class ResolvedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that takes its object from the keys preloaded by
+    ``BulkListSerializer`` or ``ResolvedKeysMixin`` instead of running a
+    query per value.
+    """
+
+    def to_internal_value(self, data):
+        resolved = self.context.get('resolved_keys', {}).get(self.field_name)
+        if resolved is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in resolved:
+            self.fail('does_not_exist', pk_value=data)
+        return resolved[pk]
+
+
+class BulkListSerializer(TimedListSerializer):
+    """
+    ListSerializer for the batch endpoints. Related keys of all items are
+    resolved up front, creates go through ``bulk_create`` and updates through
+    ``bulk_update``. For updates, ``instance`` is a ``{pk: object}`` dict and
+    every item carries the ``id`` it applies to.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self._context['resolved_keys'], self._context['missing_keys'] = resolve_related_keys(self.child, data)
+        return super().to_internal_value(data)
+
+    @property
+    def missing_keys(self):
+        return self._context.get('missing_keys', {})
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            self.child.instance = self.instance[int(data['id'])]
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return model.objects.bulk_create(
+            [model(**attrs) for attrs in validated_data],
+            batch_size=settings.CORE_BULK_BATCH_SIZE,
+        )
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        objects = []
+        fields = set()
+        for item, attrs in zip(self.initial_data, validated_data):
+            obj = instances[int(item['id'])]
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+            fields.update(attrs)
+            objects.append(obj)
+        if fields:
+            # bulk_update does not apply auto_now, the changes feed needs it
+            for field in model._meta.concrete_fields:
+                if getattr(field, 'auto_now', False):
+                    for obj in objects:
+                        field.pre_save(obj, add=False)
+                    fields.add(field.name)
+            model.objects.bulk_update(objects, sorted(fields),
+                                      batch_size=settings.CORE_BULK_BATCH_SIZE)
+        return objects
+
+
+class ProjectSerializer(ResolvedKeysMixin, TimedSerializerMixin, serializers.ModelSerializer):
     name = serializers.CharField(allow_blank=False,allow_null=False,max_length=40)
-    project_owner = serializers.PrimaryKeyRelatedField(queryset=ProjectUser.objects.all(),required=True)
+    project_owner = ResolvedPrimaryKeyRelatedField(queryset=ProjectUser.objects.all(),required=True)
 
     class Meta:
         model = Project
-        fields = ['id', 'name', 'description', 'project_owner']
+        fields = ['id', 'name', 'description', 'project_owner', 'updated_at']
+        list_serializer_class = TimedListSerializer
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsMixin, ResolvedKeysMixin, TimedSerializerMixin, serializers.ModelSerializer):
     project = serializers.CharField(allow_blank=False,allow_null=False)
-    project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all(), required=True)
-    assigned_to = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), required=False, allow_null=True)
+    project = ResolvedPrimaryKeyRelatedField(queryset=Project.objects.all(), required=True)
+    assigned_to = ResolvedPrimaryKeyRelatedField(queryset=User.objects.all(), required=False, allow_null=True)
 
     class Meta:
         model = Task
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
-class MilestoneSerializer(serializers.ModelSerializer):
-    project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all(), required=True)
+class MilestoneSerializer(SparseFieldsMixin, ResolvedKeysMixin, TimedSerializerMixin, serializers.ModelSerializer):
+    # The owner is joined in for the notification sent on save
+    project = ResolvedPrimaryKeyRelatedField(queryset=Project.objects.select_related('project_owner__user'),
+                                             required=True)
 
     class Meta:
         model = Milestone
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        list_serializer_class = BulkListSerializer
+
+class NotificationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'message', 'is_read', 'created_at']
+        list_serializer_class = TimedListSerializer
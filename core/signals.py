@@ -1,28 +1,244 @@
-from django.db.models.signals import post_save
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import Task, Milestone
-from .tasks import send_task_notification_email
+from django.utils import timezone
+from .models import Project, Task, Milestone, Tombstone
+from .cache import bump_generation
+from .roles import invalidate_roles, invalidate_token_generation, role_registry
+from . import counters, events, notifications
+
+def task_notification(instance, created):
+    """
+    Return ``(subject, message, recipients)`` for a saved task, or None when
+    nobody is assigned.
+    """
+    if instance.assigned_to is None:
+        return None
 
-@receiver(post_save, sender=Task)
-def task_post_save(sender, instance, created, **kwargs):
     if created:
         subject = f'New Task Created: {instance.name}'
         message = f'A new task has been created in the project {instance.project.name}.'
     else:
         subject = f'Task Updated: {instance.name}'
         message = f'The task in the project {instance.project.name} has been updated.'
+    return subject, message, [instance.assigned_to]
 
-    recipient_list = [instance.assigned_to.email]
-    send_task_notification_email.delay(subject, message, recipient_list)
-
-@receiver(post_save, sender=Milestone)
-def milestone_post_save(sender, instance, created, **kwargs):
+def milestone_notification(instance, created):
+    """
+    Return ``(subject, message, recipients)`` for a saved milestone.
+    """
     if created:
         subject = f'New Milestone Created: {instance.name}'
         message = f'A new milestone has been created in the project {instance.project.name}.'
     else:
         subject = f'Milestone Updated: {instance.name}'
         message = f'The milestone in the project {instance.project.name} has been updated.'
+    return subject, message, [instance.project.project_owner.user]
+
+NOTIFICATIONS = {
+    Task: task_notification,
+    Milestone: milestone_notification,
+}
+
+def notification_event(model, instance, created):
+    """
+    Return the ``(object_key, subject, message, recipients)`` event for
+    ``notifications.record``, or None.
+    """
+    notification = NOTIFICATIONS[model](instance, created)
+    if notification is None:
+        return None
+    return (f'{model._meta.label_lower}:{instance.pk}', *notification)
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Milestone)
+def notify_post_save(sender, instance, created, **kwargs):
+    event = notification_event(sender, instance, created)
+    if event:
+        transaction.on_commit(lambda: notifications.record([event]))
+
+    change = events.model_event(instance, 'created' if created else 'updated')
+    transaction.on_commit(lambda: events.publish([change]))
+
+# The queryset being deleted by delete_batch, and the rows it removed (with
+# their cascades) by model
+_delete_batch = ContextVar('core_delete_batch', default=None)
+
+def in_batch(sender, instance, origin):
+    """
+    Whether ``instance`` is one of the rows ``delete_batch`` is removing. The
+    row is recorded for ``bulk_post_delete``, and the per-row handlers leave
+    it alone.
+    """
+    batch = _delete_batch.get()
+    if batch is None or origin is not batch[0]:
+        return False
+    batch[1].setdefault(sender, {})[instance.pk] = instance
+    return True
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Milestone)
+def publish_post_delete(sender, instance, origin=None, **kwargs):
+    if in_batch(sender, instance, origin):
+        return
+    change = events.model_event(instance, 'deleted')
+    transaction.on_commit(lambda: events.publish([change]))
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Milestone)
+def count_post_save(sender, instance, created, raw=False, **kwargs):
+    # record_saves knows the project a task or milestone was moved out of,
+    # so the list and project caches are invalidated here rather than in
+    # invalidate_list_cache
+    projects = {instance.project_id} if raw else counters.record_saves(sender, [instance], created)
+    transaction.on_commit(lambda: bump_generation(sender, projects))
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Milestone)
+def count_post_delete(sender, instance, origin=None, **kwargs):
+    # Only deletes of this very object: a queryset delete is accounted for
+    # in one go by delete_batch, and a cascade from the project (or its
+    # owner) leaves no project to count on.
+    if not in_batch(sender, instance, origin) and origin is instance:
+        counters.record_deletes(sender, [instance.project_id])
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Milestone)
+def tombstone_post_delete(sender, instance, origin=None, **kwargs):
+    # Every delete, cascades included, so the changes feed never misses
+    # one; queryset deletes get theirs from bulk_post_delete
+    if in_batch(sender, instance, origin):
+        return
+    Tombstone.objects.create(kind=sender._meta.model_name, object_id=instance.pk)
+
+def bulk_post_save(model, instances, created):
+    """
+    Counterpart of the post_save handlers for ``bulk_create``/``bulk_update``,
+    which send no signals: update the project counters, invalidate the list
+    cache once, and buffer every notification and publish every change
+    event in one go.
+    """
+    projects = counters.record_saves(model, instances, created)
+    transaction.on_commit(lambda: bump_generation(model, projects))
+
+    pending = [e for e in (notification_event(model, instance, created) for instance in instances) if e]
+    if pending:
+        transaction.on_commit(lambda: notifications.record(pending))
+
+    action = 'created' if created else 'updated'
+    changes = [events.model_event(instance, action) for instance in instances]
+    transaction.on_commit(lambda: events.publish(changes))
+
+def delete_batch(queryset, delete):
+    """
+    Run ``delete`` (the queryset's own delete) and account for the rows it
+    removes once, with ``bulk_post_delete``, instead of per row. Returns
+    ``(delete() result, {pk: deleted instance})`` for the queryset's model.
+    Queryset deletes of projects, tasks and milestones come through here
+    (see ``TrackedQuerySet``).
+    """
+    deleted = {}
+    with transaction.atomic(using=queryset.db):
+        token = _delete_batch.set((queryset, deleted))
+        try:
+            result = delete()
+        finally:
+            _delete_batch.reset(token)
+        for model, rows in deleted.items():
+            # The collector clears the primary keys once the rows are gone
+            for pk, instance in rows.items():
+                instance.pk = pk
+            bulk_post_delete(model, list(rows.values()), cascade=model is not queryset.model)
+    return result, deleted.get(queryset.model, {})
+
+def bulk_post_delete(model, instances, cascade=False):
+    """
+    Counterpart of the post_delete handlers for ``delete_batch``: write the
+    tombstones in bulk, update the project counters (unless the
+    rows went with their project), invalidate the list cache once, and
+    publish every change event in one go.
+    """
+    if not instances:
+        return
+    Tombstone.objects.bulk_create(
+        [Tombstone(kind=model._meta.model_name, object_id=instance.pk) for instance in instances],
+        batch_size=settings.CORE_BULK_BATCH_SIZE,
+    )
+    if model is Project:
+        projects = {instance.pk for instance in instances}
+        transaction.on_commit(lambda: bump_generation(model, projects))
+        return
+
+    if not cascade:
+        counters.record_deletes(model, [instance.project_id for instance in instances])
+    projects = {instance.project_id for instance in instances}
+    transaction.on_commit(lambda: bump_generation(model, projects))
+
+    changes = [events.model_event(instance, 'deleted') for instance in instances]
+    transaction.on_commit(lambda: events.publish(changes))
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Milestone)
+def invalidate_list_cache(sender, instance, **kwargs):
+    if in_batch(sender, instance, kwargs.get('origin')):
+        return
+    # Bump once the write is visible, so a concurrent reader cannot cache
+    # the old rows under the new generation. Saved tasks and milestones
+    # are handled by count_post_save.
+    projects = {instance.pk if sender is Project else instance.project_id}
+    transaction.on_commit(lambda: bump_generation(sender, projects))
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_user_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if not action.startswith('post_'):
+            return
+        user_ids = [instance.pk]
+    elif action == 'pre_clear':
+        # group.user_set.clear(): collect the members before they are gone
+        user_ids = list(instance.user_set.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        user_ids = pk_set
+    else:
+        return
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: [invalidate_roles(user_id) for user_id in user_ids])
+
+@receiver(pre_save, sender=User)
+def revoke_tokens_on_credential_change(sender, instance, **kwargs):
+    # set_password() keeps the raw password in _password until the save;
+    # deactivation is caught by the active flag. Either way the stateless
+    # tokens issued so far must stop validating.
+    if instance.pk is None:
+        return
+    if instance._password is not None or not instance.is_active:
+        user_id = instance.pk
+        transaction.on_commit(lambda: invalidate_token_generation(user_id))
+
+@receiver(pre_delete, sender=User)
+def touch_assigned_tasks(sender, instance, **kwargs):
+    # The delete nulls assigned_to with a queryset update, which leaves
+    # updated_at alone and sends no signals; stamp the tasks so the changes
+    # feed sends them, and invalidate the task caches of their projects.
+    tasks = Task.objects.filter(assigned_to=instance)
+    projects = set(tasks.values_list('project_id', flat=True).distinct())
+    if projects:
+        tasks.update(updated_at=timezone.now())
+        transaction.on_commit(lambda: bump_generation(Task, projects))
+
+@receiver(post_delete, sender=User)
+def revoke_tokens_on_delete(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_token_generation(user_id))
 
-    recipient_list = [user.email for user in instance.project.project_owner.user_set.all()]
-    send_task_notification_email.delay(subject, message, recipient_list)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def reload_role_groups(sender, **kwargs):
+    role_registry.clear()
@@ -0,0 +1,45 @@
+"""
+Streaming responses that stream under both WSGI and ASGI.
+
+Given a synchronous iterator, Django's ASGI handler reads all of it before
+sending anything, so an export would be held in memory whole and
+provisioning progress would arrive in one piece at the end. Under ASGI
+``streaming_response`` therefore passes an async iterator, which pulls
+``batch`` items at a time from the synchronous one in the request's sync
+thread. Under WSGI the synchronous iterator is passed through unchanged.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+
+def is_asgi(request):
+    # A DRF Request wraps the HttpRequest
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def aiterate(iterator, batch=1):
+    """
+    Yield the items of the synchronous ``iterator``, ``batch`` at a time
+    joined into one string. The iterator runs on the request's sync thread,
+    which holds the database connection any cursor it reads from was opened
+    on.
+    """
+    take = sync_to_async(lambda: list(islice(iterator, batch)), thread_sensitive=True)
+    while True:
+        items = await take()
+        if not items:
+            return
+        yield ''.join(items)
+
+
+def streaming_response(request, iterator, content_type, batch=1):
+    """
+    A ``StreamingHttpResponse`` of ``iterator`` (of strings) that streams
+    under the handler serving ``request``.
+    """
+    if is_asgi(request):
+        iterator = aiterate(iter(iterator), batch)
+    return StreamingHttpResponse(iterator, content_type=content_type)
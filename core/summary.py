@@ -0,0 +1,91 @@
+"""
+Project dashboard: the ``project/<id>/summary`` endpoint.
+
+The summary is computed in the database with a fixed number of queries,
+whatever the size of the project:
+
+* the project row, with the denormalized counters of ``core.counters``;
+* tasks per assignee, one plain ``GROUP BY`` count over the
+  ``(project, assigned_to)`` index;
+* overdue, upcoming and due-this-week milestone counts, one aggregate with
+  conditional counts over the ``(project, due_date)`` index;
+* the next milestones and the most recently missed ones, two short range
+  scans of the same index.
+
+Results are cached per project and day. The key holds the project's
+generations of ``Project``, ``Task`` and ``Milestone`` (see
+``core.cache``), so a write invalidates the summaries of the projects it
+touched and no others.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .cache import get_generations
+from .instrumentation import record_cache
+from .models import Project, Task, Milestone
+
+
+SUMMARY_KEY = 'core:summary:{}:{}:{}'
+
+PROJECT_COLUMNS = ('id', 'name', 'task_count', 'milestone_count', 'next_due_date')
+MILESTONE_COLUMNS = ('id', 'name', 'due_date')
+
+
+def compute_summary(project_id, today):
+    """
+    Return the summary of project ``project_id`` as of ``today``, or None
+    if there is no such project.
+    """
+    project = Project.objects.filter(pk=project_id).values(*PROJECT_COLUMNS).first()
+    if project is None:
+        return None
+
+    # A plain count: tasks have no state to count conditionally, and any
+    # column outside the index would take the scan back to the table
+    tasks_by_assignee = list(
+        Task.objects.filter(project=project_id).values('assigned_to')
+        .annotate(tasks=Count('id')).order_by('-tasks', 'assigned_to')
+    )
+
+    milestones = Milestone.objects.filter(project=project_id)
+    counts = milestones.aggregate(
+        overdue=Count('id', filter=Q(due_date__lt=today)),
+        upcoming=Count('id', filter=Q(due_date__gte=today)),
+        due_this_week=Count('id', filter=Q(due_date__gte=today, due_date__lt=today + timedelta(days=7))),
+    )
+    limit = settings.CORE_SUMMARY_MILESTONES
+    upcoming = list(milestones.filter(due_date__gte=today).order_by('due_date', 'id')
+                    .values(*MILESTONE_COLUMNS)[:limit])
+    overdue = list(milestones.filter(due_date__lt=today).order_by('-due_date', '-id')
+                   .values(*MILESTONE_COLUMNS)[:limit])
+
+    return {
+        'project': project,
+        'tasks_by_assignee': tasks_by_assignee,
+        'milestones': counts,
+        'upcoming_milestones': upcoming,
+        'overdue_milestones': overdue,
+        'as_of': today,
+    }
+
+
+def project_summary(project_id):
+    """
+    The cached summary of project ``project_id``, or None if there is no
+    such project.
+    """
+    today = timezone.localdate()
+    generations = get_generations((Project, Task, Milestone), scope=project_id)
+    # Overdue and upcoming move at midnight, with or without writes
+    key = SUMMARY_KEY.format(project_id, today.isoformat(), '.'.join(map(str, generations)))
+    summary = cache.get(key)
+    record_cache(summary is not None)
+    if summary is None:
+        summary = compute_summary(project_id, today)
+        if summary is not None:
+            cache.set(key, summary, settings.CORE_CACHE_TIMEOUT)
+    return summary
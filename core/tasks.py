@@ -4,4 +4,21 @@ from django.conf import settings
 
 @shared_task
 def send_task_notification_email(subject, message, recipient_list):
+    # No longer enqueued (see flush_notifications); kept so messages queued
+    # before an upgrade are still delivered.
     send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, recipient_list)
+
+@shared_task
+def flush_notifications(window):
+    from .notifications import flush
+    return flush(window)
+
+@shared_task
+def refresh_project_due_dates():
+    from .counters import refresh_due_dates
+    return refresh_due_dates()
+
+@shared_task
+def purge_tombstones():
+    from .changes import purge_tombstones
+    return purge_tombstones()
@@ -1,11 +1,27 @@
 from django.test import TestCase
-from rest_framework.test import APITestCase
+from django.conf import settings
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework.request import Request
 from .models import Project
 from .views import ProjectView
 from .serializers import *
+from .permissions import AdminPermission, ManagerPermission, MemberPermission
 from .models import *
 from rest_framework.authtoken.models import Token
-from datetime import date
+import json
+from datetime import date, timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from .cache import get_generations, response_cache_key
+from .roles import role_cache, role_registry, get_roles, ROLE_NAMES
+from . import counters, events, notifications
+from .instrumentation import registry
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
 
 class ProjectModelTestCase(TestCase):
     def setUp(self):
@@ -77,7 +93,7 @@ class ProjectSerializerTestCase(TestCase):
     def test_project_serialization(self):
         serializer = ProjectSerializer(self.project)
         data = serializer.data
-        self.assertEqual(set(data.keys()), {'id', 'name', 'description', 'project_owner'})
+        self.assertEqual(set(data.keys()), {'id', 'name', 'description', 'project_owner', 'updated_at'})
         self.assertEqual(data['name'], self.project.name)
         self.assertEqual(data['description'], self.project.description)
         self.assertEqual(data['project_owner'], self.project_owner.id)
@@ -102,7 +118,7 @@ class TaskSerializerTestCase(TestCase):
     def test_task_serialization(self):
         serializer = TaskSerializer(self.task)
         data = serializer.data
-        self.assertEqual(set(data.keys()), {'id', 'project', 'name', 'description', 'assigned_to'})
+        self.assertEqual(set(data.keys()), {'id', 'project', 'name', 'description', 'assigned_to', 'updated_at'})
         self.assertEqual(data['project'], self.project.id)
         self.assertEqual(data['name'], self.task.name)
         self.assertEqual(data['description'], self.task.description)
@@ -129,7 +145,7 @@ class MilestoneSerializerTestCase(TestCase):
     def test_milestone_serialization(self):
         serializer = MilestoneSerializer(self.milestone)
         data = serializer.data
-        self.assertEqual(set(data.keys()), {'id', 'project', 'name', 'due_date'})
+        self.assertEqual(set(data.keys()), {'id', 'project', 'name', 'due_date', 'updated_at'})
         self.assertEqual(data['project'], self.project.id)
         self.assertEqual(data['name'], self.milestone.name)
         self.assertEqual(data['due_date'], '2024-06-15')
@@ -141,4 +157,1041 @@ class MilestoneSerializerTestCase(TestCase):
         milestone = serializer.save()
         self.assertEqual(milestone.project, self.project)
         self.assertEqual(milestone.name, 'New Milestone')
-        self.assertEqual(milestone.due_date, date(2024, 6, 20))
\ No newline at end of file
+        self.assertEqual(milestone.due_date, date(2024, 6, 20))
+
+class ListCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.user = User.objects.create_user(username='member', password='password123')
+        self.project_user = ProjectUser.objects.create(user=self.user, role='member')
+        self.other = User.objects.create_user(username='other', password='password123')
+        ProjectUser.objects.create(user=self.other, role='member')
+        self.project = Project.objects.create(name='Test Project', project_owner=self.project_user)
+        self.client.force_authenticate(self.user)
+
+    def test_write_invalidates_cached_page(self):
+        response = self.client.get('/core/taskview')
+        self.assertEqual(response.data['count'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(project=self.project, name='Fresh Task')
+
+        response = self.client.get('/core/taskview')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_cached_page_is_served_without_queries(self):
+        self.client.get('/core/milestoneview')
+        with self.assertNumQueries(0):
+            response = self.client.get('/core/milestoneview')
+        self.assertEqual(response.status_code, 200)
+
+    def test_matching_etag_gets_304_until_a_write(self):
+        response = self.client.get('/core/taskview')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/core/taskview', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get('/core/taskview', headers={'If-None-Match': f'"other", W/{etag}'})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/core/taskview?page=1', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(project=self.project, name='Fresh Task')
+        response = self.client.get('/core/taskview', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_async_view_honours_etag(self):
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        response = self.client.get('/core/asyncmilestoneview', headers=headers)
+        response = self.client.get('/core/asyncmilestoneview', headers={**headers, 'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_cache_is_scoped_per_user(self):
+        request = Request(APIRequestFactory().get('/core/project', {'page': 2}))
+        request.user = self.user
+        first = response_cache_key(request, [Project])
+        request.user = self.other
+        second = response_cache_key(request, [Project])
+        self.assertNotEqual(first, second)
+
+
+class RoleCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='password123')
+        self.project_user = ProjectUser.objects.create(user=self.user, role='member')
+        self.request = Request(APIRequestFactory().get('/core/project'))
+        self.request.user = self.user
+
+    def test_roles_loaded_once_per_request(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(MemberPermission().has_permission(self.request, None))
+            self.assertFalse(AdminPermission().has_permission(self.request, None))
+            self.assertFalse(ManagerPermission().has_permission(self.request, None))
+
+    def test_steady_state_needs_no_queries(self):
+        get_roles(self.request)
+        request = Request(APIRequestFactory().get('/core/project'))
+        request.user = self.user
+        with self.assertNumQueries(0):
+            self.assertEqual(get_roles(request), {'member'})
+        self.assertEqual(role_cache.hit_rate(), 0.5)
+
+    def test_role_change_invalidates_cache(self):
+        self.assertEqual(role_cache.get(self.user.pk), {'member'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project_user.role = 'admin'
+            self.project_user.save()
+            # Not before the commit, or a concurrent request could cache
+            # the old role again
+            self.assertEqual(role_cache.get(self.user.pk), {'member'})
+        self.assertIn('admin', role_cache.get(self.user.pk))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.clear()
+        self.assertEqual(role_cache.get(self.user.pk), frozenset())
+
+
+class RoleRegistryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        role_registry.clear()
+        self.user = User.objects.create_user(username='testuser', password='password123')
+
+    def groups(self):
+        return sorted(self.user.groups.values_list('name', flat=True))
+
+    def test_groups_are_seeded_and_resolved_once(self):
+        self.assertEqual(Group.objects.filter(name__in=ROLE_NAMES).count(), 3)
+        with self.assertNumQueries(1):
+            role_registry.group_ids()
+            role_registry.group_id('admin')
+
+    def test_unchanged_role_does_not_touch_groups(self):
+        project_user = ProjectUser.objects.create(user=self.user, role='member')
+        project_user = ProjectUser.objects.get(pk=project_user.pk)
+        with self.assertNumQueries(1):
+            project_user.save()
+
+    def test_role_change_moves_group(self):
+        project_user = ProjectUser.objects.create(user=self.user, role='member')
+        self.assertEqual(self.groups(), ['member'])
+        project_user.role = 'manager'
+        with self.captureOnCommitCallbacks(execute=True):
+            project_user.save()
+        self.assertEqual(self.groups(), ['manager'])
+        self.assertEqual(role_cache.get(self.user.pk), frozenset({'manager'}))
+
+    def test_group_kept_while_another_project_user_has_the_role(self):
+        ProjectUser.objects.create(user=self.user, role='member')
+        second = ProjectUser.objects.create(user=self.user, role='member')
+        second.role = 'admin'
+        second.save()
+        self.assertEqual(self.groups(), ['admin', 'member'])
+
+
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.user = User.objects.create_user(username='member', password='password123')
+        project_user = ProjectUser.objects.create(user=self.user, role='member')
+        self.project = Project.objects.create(name='Test Project', project_owner=project_user)
+        Task.objects.bulk_create(Task(project=self.project, name=f'Task {i}') for i in range(25))
+        Milestone.objects.bulk_create(
+            Milestone(project=self.project, name=f'Milestone {i}', due_date=date(2024, 6, 1 + i % 3))
+            for i in range(12)
+        )
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url):
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            names += [row['name'] for row in response.data['results']]
+            url = response.data['next']
+        return names
+
+    def test_cursor_walks_every_task_once(self):
+        names = self.walk('/core/taskview?pagination=cursor')
+        self.assertEqual(names, [f'Task {i}' for i in range(25)])
+
+    def test_cursor_orders_milestones_by_due_date(self):
+        names = self.walk('/core/milestoneview?pagination=cursor&page_size=5')
+        expected = Milestone.objects.order_by('due_date', 'id').values_list('name', flat=True)
+        self.assertEqual(names, list(expected))
+
+    def test_cursor_page_runs_no_count_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/core/taskview?pagination=cursor')
+        self.assertFalse(any('COUNT' in query['sql'] for query in queries))
+
+    def test_tampered_cursor_is_rejected(self):
+        response = self.client.get('/core/taskview?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_numbers_remain_the_default(self):
+        response = self.client.get('/core/taskview?page=3')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class ListFilterTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.user = User.objects.create_user(username='member', password='password123')
+        self.other_user = User.objects.create_user(username='other', password='password123')
+        project_user = ProjectUser.objects.create(user=self.user, role='member')
+        self.project = Project.objects.create(name='Test Project', project_owner=project_user)
+        self.other = Project.objects.create(name='Other Project', project_owner=project_user)
+        Task.objects.bulk_create(
+            Task(project=self.project if i % 2 else self.other, name=f'{"Design" if i % 3 else "Build"} {i}',
+                 assigned_to=self.user if i < 6 else self.other_user)
+            for i in range(12)
+        )
+        Milestone.objects.bulk_create(
+            Milestone(project=self.project, name=f'Milestone {i}', due_date=date(2024, 6, 1 + i)) for i in range(10)
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_filters_narrow_the_task_list(self):
+        response = self.client.get('/core/taskview', {'project': self.project.id, 'assigned_to': self.user.id,
+                                                      'search': 'design', 'page_size': 100})
+        expected = Task.objects.filter(project=self.project, assigned_to=self.user, name__icontains='design')
+        self.assertEqual(response.data['count'], expected.count())
+        self.assertEqual([row['id'] for row in response.data['results']],
+                         list(expected.order_by('id').values_list('id', flat=True)))
+
+        response = self.client.get('/core/taskview', {'project': f'{self.project.id},{self.other.id}'})
+        self.assertEqual(response.data['count'], 12)
+
+    def test_due_date_range_with_cursor(self):
+        response = self.client.get('/core/milestoneview', {'from': '2024-06-03', 'to': '2024-06-05',
+                                                           'pagination': 'cursor'})
+        self.assertEqual([row['due_date'] for row in response.data['results']],
+                         ['2024-06-03', '2024-06-04', '2024-06-05'])
+
+    def test_sparse_fieldset_loads_and_returns_only_those_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/core/milestoneview', {'fields': 'id,name', 'pagination': 'cursor',
+                                                               'page_size': 5})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name'})
+        select = next(query['sql'] for query in queries if 'FROM "core_milestone"' in query['sql'])
+        # due_date is loaded for the keyset cursor, project_id is not
+        self.assertNotIn('project_id', select.split('FROM')[0])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_invalid_parameters(self):
+        for params in ({'project': 'abc'}, {'fields': 'id,secret'}):
+            response = self.client.get('/core/taskview', params)
+            self.assertEqual(response.status_code, 400)
+        response = self.client.get('/core/milestoneview', {'from': '06/01/2024'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('from', response.data['error'])
+
+
+class BulkEndpointTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.user = User.objects.create_user(username='admin', email='admin@example.com', password='password123')
+        self.project_user = ProjectUser.objects.create(user=self.user, role='admin')
+        ProjectUser.objects.create(user=self.user, role='manager')
+        self.project = Project.objects.create(name='Test Project', project_owner=self.project_user)
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_resolves_keys_once_and_sends_one_job(self):
+        payload = [{'project': self.project.id, 'name': f'Task {i}', 'assigned_to': self.user.id}
+                   for i in range(50)]
+        with CaptureQueriesContext(connection) as queries, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/core/taskbulkcreate', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['results']), 50)
+        self.assertEqual(Task.objects.count(), 50)
+        self.assertLess(len(queries), 10)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, '50 updates in your projects')
+
+    def test_bulk_create_reports_per_item_errors(self):
+        payload = [{'project': self.project.id, 'name': 'Valid'},
+                   {'project': 999, 'name': 'Unknown project'}]
+        response = self.client.post('/core/taskbulkcreate', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'][0], {})
+        self.assertIn('project', response.data['error'][1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_create_reports_missing_ids(self):
+        payload = [{'project': self.project.id, 'name': 'Valid', 'assigned_to': self.user.id},
+                   {'project': 999, 'name': 'Unknown project', 'assigned_to': 888},
+                   {'project': 998, 'name': 'Unknown project'}]
+        response = self.client.post('/core/taskbulkcreate', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['missing'], {'project': [998, 999], 'assigned_to': [888]})
+
+    def test_single_object_keys_resolved_with_one_query_per_model(self):
+        serializer = TaskSerializer(data={'project': self.project.id, 'name': 'One', 'assigned_to': self.user.id})
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data['project'], self.project)
+
+        serializer = ProjectSerializer(data={'name': 'New', 'project_owner': 12345})
+        with self.assertNumQueries(1):
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.missing_keys, {'project_owner': [12345]})
+        self.assertIn('project_owner', serializer.errors)
+
+    def test_bulk_update(self):
+        milestones = Milestone.objects.bulk_create(
+            Milestone(project=self.project, name=f'Milestone {i}', due_date=date(2024, 6, 1)) for i in range(3)
+        )
+        payload = [{'id': m.id, 'due_date': '2024-07-01'} for m in milestones]
+        response = self.client.put('/core/milestonebulkupdate', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Milestone.objects.filter(due_date=date(2024, 7, 1)).count(), 3)
+
+        response = self.client.put('/core/milestonebulkupdate', [{'id': 999, 'name': 'x'}], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_delete(self):
+        tasks = Task.objects.bulk_create(Task(project=self.project, name=f'Task {i}') for i in range(3))
+        response = self.client.delete('/core/taskbulkdelete', {'ids': [tasks[0].id, 999]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [{'id': tasks[0].id, 'deleted': True},
+                                                    {'id': 999, 'deleted': False}])
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_bulk_delete_accounts_once_per_batch(self):
+        tasks = Task.objects.bulk_create(Task(project=self.project, name=f'Task {i}') for i in range(100))
+        counters.recount()
+        with mock.patch('core.events.publish') as publish, \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.delete('/core/taskbulkdelete', {'ids': [task.id for task in tasks]},
+                                          format='json')
+        self.assertEqual(response.status_code, 200)
+        # One cache invalidation and one event publish for the whole batch
+        self.assertEqual(len(callbacks), 2)
+        publish.assert_called_once()
+        self.assertEqual(sorted(event['id'] for event in publish.call_args.args[0]), [task.id for task in tasks])
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.task_count, 0)
+
+
+class NotificationDigestTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', email='owner@example.com', password='password123')
+        self.project_user = ProjectUser.objects.create(user=self.user, role='admin')
+        self.project = Project.objects.create(name='Test Project', project_owner=self.project_user)
+
+    def test_single_event_is_sent_as_is(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(project=self.project, name='Write docs', assigned_to=self.user)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'New Task Created: Write docs')
+        self.assertEqual(mail.outbox[0].to, ['owner@example.com'])
+
+    def test_window_is_coalesced_into_one_digest(self):
+        with mock.patch('core.tasks.flush_notifications.apply_async') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                task = Task.objects.create(project=self.project, name='Write docs', assigned_to=self.user)
+                for _ in range(5):
+                    task.save()
+                Milestone.objects.create(project=self.project, name='Release', due_date=date(2024, 6, 15))
+        schedule.assert_called_once()
+        window = schedule.call_args.kwargs['args'][0]
+
+        self.assertEqual(notifications.flush(window), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, '2 updates in your projects')
+        self.assertIn('Task Updated: Write docs', mail.outbox[0].body)
+        self.assertIn('New Milestone Created: Release', mail.outbox[0].body)
+
+
+class NotificationInboxTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', email='owner@example.com', password='password123')
+        project_user = ProjectUser.objects.create(user=self.user, role='admin')
+        self.project = Project.objects.create(name='Test Project', project_owner=project_user)
+        self.client.force_authenticate(self.user)
+        with mock.patch('core.tasks.flush_notifications.apply_async'), \
+                self.captureOnCommitCallbacks(execute=True):
+            for i in range(12):
+                Task.objects.create(project=self.project, name=f'Task {i}', assigned_to=self.user)
+
+    def test_signals_write_inbox_rows(self):
+        self.assertEqual(Notification.objects.filter(user=self.user, is_read=False).count(), 12)
+
+    def test_inbox_pages_newest_first(self):
+        response = self.client.get('/core/notificationview')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIn('Task 11', response.data['results'][0]['message'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+    def test_unread_count_is_served_from_the_counter(self):
+        self.assertEqual(self.client.get('/core/notificationcount').data['unread'], 12)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/core/notificationcount').data['unread'], 12)
+
+        ids = list(Notification.objects.values_list('id', flat=True)[:5])
+        response = self.client.put('/core/notificationread', {'ids': ids}, format='json')
+        self.assertEqual(response.data['updated'], 5)
+        self.assertEqual(response.data['unread'], 7)
+
+        response = self.client.put('/core/notificationread', {'all': True}, format='json')
+        self.assertEqual(response.data['unread'], 0)
+
+
+class EventStreamTestCase(TestCase):
+    def setUp(self):
+        role_cache.clear()
+        self.user = User.objects.create_user(username='member', password='password123')
+        project_user = ProjectUser.objects.create(user=self.user, role='member')
+        self.project = Project.objects.create(name='Test Project', project_owner=project_user)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    async def test_stream_delivers_events_for_own_projects(self):
+        response = await self.async_client.get('/core/eventstream',
+                                               headers={'Authorization': f'Bearer {self.token}'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+
+        events.publish([{'type': 'task', 'action': 'created', 'id': 1, 'project': self.project.id + 1},
+                        {'type': 'task', 'action': 'created', 'id': 2, 'project': self.project.id}])
+        chunk = await anext(stream)
+        self.assertTrue(chunk.startswith(b'event: task\n'))
+        self.assertIn(b'"id": 2', chunk)
+        await stream.aclose()
+
+    async def test_stream_requires_authentication(self):
+        response = await self.async_client.get('/core/eventstream')
+        self.assertEqual(response.status_code, 401)
+
+    def test_saves_publish_events(self):
+        with mock.patch('core.events.publish') as publish, \
+                self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(project=self.project, name='Task')
+            task.delete()
+        actions = [call.args[0][0]['action'] for call in publish.call_args_list]
+        self.assertEqual(actions, ['created', 'deleted'])
+
+
+class QueryCountAssertionsMixin:
+    """
+    Assertions that fail when an endpoint's query count grows with the
+    number of rows it returns, i.e. when something fetches per row.
+    """
+    page_sizes = (1, 5, 20)
+
+    def count_queries(self, url, params):
+        cache.clear()
+        role_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertQueriesIndependentOfPageSize(self, url, params=None):
+        counts = {size: self.count_queries(url, {**(params or {}), 'page_size': size})
+                  for size in self.page_sizes}
+        self.assertEqual(len(set(counts.values())), 1,
+                         f'{url} runs a different number of queries per page size: {counts}')
+
+
+class QueryPlanTestCase(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.user = User.objects.create_user(username='member', email='member@example.com', password='password123')
+        self.project_user = ProjectUser.objects.create(user=self.user, role='member')
+        ProjectUser.objects.create(user=self.user, role='manager')
+        projects = Project.objects.bulk_create(
+            Project(name=f'Project {i}', project_owner=self.project_user) for i in range(20)
+        )
+        Task.objects.bulk_create(
+            Task(project=projects[i % 20], name=f'Task {i}', assigned_to=self.user) for i in range(40)
+        )
+        Milestone.objects.bulk_create(
+            Milestone(project=projects[i % 20], name=f'Milestone {i}', due_date=date(2024, 6, 15)) for i in range(40)
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_endpoints_do_not_fetch_per_row(self):
+        self.assertQueriesIndependentOfPageSize('/core/project')
+        self.assertQueriesIndependentOfPageSize('/core/taskview', {'pagination': 'cursor'})
+        self.assertQueriesIndependentOfPageSize('/core/milestoneview', {'pagination': 'cursor'})
+
+    def test_update_notifications_use_joined_rows(self):
+        task = Task.objects.first()
+        milestone = Milestone.objects.first()
+        # permission, fetch with joins, savepoint, update, release; a rename
+        # leaves the project counters alone
+        with self.assertNumQueries(5):
+            self.client.put('/core/taskupdate', {'id': task.id, 'name': 'Renamed'}, format='json')
+        cache.clear()
+        role_cache.clear()
+        with self.assertNumQueries(5):
+            self.client.put('/core/milestoneupdate', {'id': milestone.id, 'name': 'Renamed'}, format='json')
+
+
+class AsyncListViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.user = User.objects.create_user(username='member', password='password123')
+        project_user = ProjectUser.objects.create(user=self.user, role='member')
+        project = Project.objects.create(name='Test Project', project_owner=project_user)
+        Task.objects.bulk_create(Task(project=project, name=f'Task {i}') for i in range(15))
+        Milestone.objects.bulk_create(
+            Milestone(project=project, name=f'Milestone {i}', due_date=date(2024, 6, 15 - i)) for i in range(5)
+        )
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    def test_async_views_match_sync_views(self):
+        for sync_url, async_url, params in [
+            ('/core/project', '/core/asyncproject', {}),
+            ('/core/taskview', '/core/asynctaskview', {'page': 2}),
+            ('/core/milestoneview', '/core/asyncmilestoneview', {'pagination': 'cursor'}),
+            ('/core/taskview', '/core/asynctaskview', {'search': 'task 1', 'fields': 'id,name'}),
+        ]:
+            expected = self.client.get(sync_url, params, headers=self.headers)
+            actual = self.client.get(async_url, params, headers=self.headers)
+            self.assertEqual(actual.status_code, 200)
+            # Same payload; only the pagination links point at the async path
+            self.assertEqual(actual.json()['results'], expected.json()['results'])
+            self.assertEqual(actual.json().get('count'), expected.json().get('count'))
+
+    async def test_async_view_requires_authentication(self):
+        response = await self.async_client.get('/core/asynctaskview')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_async_view_runs_in_the_event_loop(self):
+        response = await self.async_client.get('/core/asynctaskview', {'page': 2}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 15)
+        self.assertEqual(len(response.json()['results']), 5)
+
+
+class ExportTestCase(APITestCase):
+    def setUp(self):
+        role_cache.clear()
+        self.user = User.objects.create_user(username='member', password='password123')
+        project_user = ProjectUser.objects.create(user=self.user, role='member')
+        self.project = Project.objects.create(name='Test Project', project_owner=project_user)
+        other = Project.objects.create(name='Other Project', project_owner=project_user)
+        Task.objects.bulk_create(Task(project=self.project, name=f'Task {i}') for i in range(5))
+        Task.objects.create(project=other, name='Elsewhere')
+        Milestone.objects.bulk_create(
+            Milestone(project=self.project, name=f'Milestone {i}', due_date=date(2024, 6, 1 + i)) for i in range(5)
+        )
+        self.client.force_authenticate(self.user)
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_export_filters_by_project(self):
+        body = self.read(self.client.get('/core/taskexport', {'project': self.project.id}))
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['name'] for row in rows], [f'Task {i}' for i in range(5)])
+        self.assertEqual(set(rows[0]), {'id', 'name', 'description', 'project', 'assigned_to'})
+
+    def test_csv_export_filters_by_date_range(self):
+        body = self.read(self.client.get('/core/milestoneexport',
+                                         {'output': 'csv', 'from': '2024-06-02', 'to': '2024-06-03'}))
+        lines = body.splitlines()
+        self.assertEqual(lines[0], 'id,name,due_date,project')
+        self.assertEqual([line.split(',')[2] for line in lines[1:]], ['2024-06-02', '2024-06-03'])
+
+    def test_invalid_filters_are_rejected(self):
+        response = self.client.get('/core/milestoneexport', {'from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(CORE_EXPORT_CHUNK_SIZE=2)
+    async def test_streams_asynchronously_under_asgi(self):
+        # A sync iterator would be read whole by the ASGI handler
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        response = await self.async_client.get('/core/taskexport', {'project': self.project.id}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(len(b''.join(chunks).decode().splitlines()), 5)
+
+
+class InstrumentationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        registry.clear()
+        self.user = User.objects.create_user(username='member', password='password123')
+        project_user = ProjectUser.objects.create(user=self.user, role='member')
+        project = Project.objects.create(name='Test Project', project_owner=project_user)
+        Task.objects.bulk_create(Task(project=project, name=f'Task {i}') for i in range(3))
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+
+    def timings(self, response):
+        return dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+
+    @override_settings(CORE_METRICS_SAMPLE_RATE=1)
+    def test_sampled_request_reports_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            first = self.client.get('/core/taskview', headers=self.headers)
+        timings = self.timings(first)
+        self.assertIn(f'desc="{len(queries)} queries"', timings['db'])
+        self.assertIn('serialize', timings)
+        self.assertEqual(timings['cache'], 'desc="hit=0 miss=2"')  # roles, then response
+
+        second = self.client.get('/core/taskview', headers=self.headers)
+        self.assertEqual(self.timings(second)['cache'], 'desc="hit=2 miss=0"')
+
+    @override_settings(CORE_METRICS_SAMPLE_RATE=1)
+    def test_async_view_queries_are_counted(self):
+        response = self.client.get('/core/asynctaskview', headers=self.headers)
+        self.assertNotIn('desc="0 queries"', self.timings(response)['db'])
+
+    @override_settings(CORE_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_measured(self):
+        response = self.client.get('/core/taskview', headers=self.headers)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(registry.routes, {})
+
+    @override_settings(CORE_METRICS_SAMPLE_RATE=1, CORE_METRICS_TOKEN='scrape-secret')
+    def test_metrics_endpoint_exposes_route_histograms(self):
+        self.client.get('/core/taskview', headers=self.headers)
+        self.assertEqual(self.client.get('/core/metrics').status_code, 401)
+
+        response = self.client.get('/core/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE core_request_duration_seconds histogram', body)
+        self.assertRegex(body, r'core_request_duration_seconds_count\{route="core/taskview",method="GET",pid="\d+"\} 1')
+        self.assertRegex(body, r'core_cache_requests_total\{route="core/taskview",.*result="miss"\} 2')
+
+
+class StatelessAuthTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.user = User.objects.create_user(username='member', password='password123')
+        self.project_user = ProjectUser.objects.create(user=self.user, role='member')
+        project = Project.objects.create(name='Test Project', project_owner=self.project_user)
+        Task.objects.create(project=project, name='Task')
+
+    def login(self):
+        response = self.client.post('/user/login', {'username': 'member', 'password': 'password123'})
+        self.assertEqual(response.status_code, 200)
+        return {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+    def test_cached_read_needs_no_auth_queries(self):
+        headers = self.login()
+        self.assertEqual(self.client.get('/core/taskview', headers=headers).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get('/core/taskview', headers=headers)
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_claimed_roles_drive_permissions(self):
+        headers = self.login()
+        # Only admins may create projects
+        response = self.client.post('/core/projectcreate', {'name': 'New', 'project_owner': self.project_user.id},
+                                    headers=headers)
+        self.assertEqual(response.status_code, 403)
+
+    def test_password_change_revokes_tokens(self):
+        headers = self.login()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('another-password')
+            self.user.save()
+        self.assertEqual(self.client.get('/core/taskview', headers=headers).status_code, 401)
+
+    def test_role_change_revokes_tokens(self):
+        headers = self.login()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(Group.objects.get_or_create(name='admin')[0])
+        self.assertEqual(self.client.get('/core/taskview', headers=headers).status_code, 401)
+        self.assertEqual(self.client.get('/core/taskview', headers=self.login()).status_code, 200)
+
+    def test_revocation_survives_cache_eviction(self):
+        headers = self.login()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.clear()
+        self.assertEqual(self.client.get('/core/taskview', headers=headers).status_code, 401)
+
+    def test_tokens_without_claims_use_the_database(self):
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        self.assertEqual(self.client.get('/core/taskview', headers=headers).status_code, 200)
+
+    async def test_async_views_accept_stateless_tokens(self):
+        response = await self.async_client.post('/user/login', {'username': 'member', 'password': 'password123'})
+        headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+        response = await self.async_client.get('/core/asynctaskview', headers=headers)
+        self.assertEqual(response.status_code, 200)
+
+
+class BenchmarkScenarioTestCase(TestCase):
+    def test_every_named_url_has_a_scenario(self):
+        from django.urls import get_resolver
+        from .benchmarks import SCENARIOS, EXCLUDED
+        names = {name for name in get_resolver().reverse_dict if isinstance(name, str)}
+        names -= {'admin'} | {name for name in names if name.startswith(('admin:', 'django'))}
+        self.assertEqual(names - set(SCENARIOS) - set(EXCLUDED), set())
+        self.assertEqual(set(SCENARIOS) - names, set())
+
+    @override_settings(PROVISION_PROCESSES=0)
+    def test_every_scenario_runs_without_failures(self):
+        from .benchmarks import BenchmarkContext, SCENARIOS, run_scenario, seed
+        context = BenchmarkContext(seed(users=2, projects=2, tasks=5, milestones=3)[0])
+        failed = {name: result['failures'] for name in SCENARIOS
+                  for result in [run_scenario(context, name, iterations=3, alloc_iterations=0)]
+                  if result['failures']}
+        self.assertEqual(failed, {})
+
+    def test_percentile_and_compare(self):
+        from .benchmarks import percentile, compare
+        self.assertEqual(percentile([5, 1, 3, 2, 4], 0.5), 3)
+        self.assertEqual(percentile(list(range(1, 101)), 0.99), 99)
+        before = {'taskview': {'p50_ms': 10.0, 'queries': 3}}
+        self.assertEqual(compare(before, {'taskview': {'p50_ms': 11.0, 'queries': 3}}, 0.2), [])
+        self.assertEqual(compare(before, {'taskview': {'p50_ms': 10.0, 'queries': 4}}, 0.2),
+                         [('taskview', 'queries', 3, 4)])
+
+
+class StartupTestCase(TestCase):
+    def test_url_loading_is_db_free_and_lazy(self):
+        from .management.commands.startup_profile import Command
+        code = ('import django; django.setup()\n'
+                'from django.urls import get_resolver; get_resolver().url_patterns\n'
+                "assert 'core.views' not in sys.modules and 'rest_framework.views' not in sys.modules")
+        result, _ = Command().run(code)
+        self.assertEqual(result['db_connections'], [])
+
+    def test_lazy_view_imports_on_first_request(self):
+        from django.urls import resolve
+        view = resolve('/core/project').func
+        self.assertEqual(view.__name__, 'ProjectView')
+        self.assertTrue(view.csrf_exempt)
+        # Served by the real APIView: JWT authentication rejects the request
+        self.assertEqual(self.client.get('/core/project').status_code, 401)
+
+
+class DatabaseProfileTestCase(TestCase):
+    def test_sqlite_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_invalid_pragma_rejected(self):
+        from .database import configure_sqlite
+        with override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL; DROP TABLE core_task'}):
+            with self.assertRaises(ValueError):
+                configure_sqlite(connection=connection)
+
+
+class ProjectCountersTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.user = User.objects.create_user(username='admin', email='admin@example.com', password='password123')
+        self.project_user = ProjectUser.objects.create(user=self.user, role='admin')
+        ProjectUser.objects.create(user=self.user, role='manager')
+        self.project = Project.objects.create(name='Test Project', project_owner=self.project_user)
+        self.other = Project.objects.create(name='Other Project', project_owner=self.project_user)
+        self.client.force_authenticate(self.user)
+
+    def counters(self, project):
+        project.refresh_from_db()
+        return project.task_count, project.milestone_count, project.next_due_date
+
+    def test_task_counts_follow_writes(self):
+        self.client.post('/core/taskcreate', {'project': self.project.id, 'name': 'One'}, format='json')
+        payload = [{'project': self.project.id, 'name': f'Task {i}'} for i in range(3)]
+        self.client.post('/core/taskbulkcreate', payload, format='json')
+        self.assertEqual(self.counters(self.project)[0], 4)
+
+        task = Task.objects.first()
+        self.client.put('/core/taskupdate', {'id': task.id, 'project': self.other.id}, format='json')
+        self.assertEqual((self.counters(self.project)[0], self.counters(self.other)[0]), (3, 1))
+
+        self.client.delete('/core/taskdelete', {'id': task.id}, format='json')
+        ids = list(Task.objects.values_list('id', flat=True)[:2])
+        self.client.delete('/core/taskbulkdelete', {'ids': ids}, format='json')
+        self.assertEqual((self.counters(self.project)[0], self.counters(self.other)[0]), (1, 0))
+
+    def test_next_due_date(self):
+        today = date.today()
+        soon, later = today + timedelta(days=3), today + timedelta(days=10)
+        for due in (later, soon, today - timedelta(days=1)):
+            self.client.post('/core/milestonecreate', {'project': self.project.id, 'name': 'M',
+                                                       'due_date': due.isoformat()}, format='json')
+        self.assertEqual(self.counters(self.project)[1:], (3, soon))
+
+        milestone = Milestone.objects.get(due_date=soon)
+        self.client.put('/core/milestoneupdate', {'id': milestone.id, 'due_date': (today + timedelta(days=20)).isoformat()},
+                        format='json')
+        self.assertEqual(self.counters(self.project)[1:], (3, later))
+        self.client.delete('/core/milestonedelete', {'id': Milestone.objects.get(due_date=later).id}, format='json')
+        self.assertEqual(self.counters(self.project)[2], today + timedelta(days=20))
+
+    def test_string_due_date(self):
+        # Django accepts an ISO string for a DateField and saves it unparsed
+        soon = date.today() + timedelta(days=2)
+        milestone = Milestone.objects.create(project=self.project, name='M', due_date=soon.isoformat())
+        self.assertEqual(self.counters(self.project)[1:], (1, soon))
+        milestone.due_date = soon.isoformat()
+        milestone.name = 'Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            milestone.save()
+        # The same date as a string is no change: no due-date recompute
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE "core_project"')])
+
+    def test_project_update_keeps_counters(self):
+        Task.objects.create(project=self.project, name='Counted')
+        stale = Project.objects.get(pk=self.project.pk)
+        Task.objects.create(project=self.project, name='Counted')
+        stale.name = 'Renamed'
+        stale.save()
+        self.assertEqual(self.counters(self.project)[0], 2)
+
+    def test_recount_matches_incremental_counts(self):
+        Task.objects.bulk_create(Task(project=self.other, name=f'Task {i}') for i in range(5))
+        counters.recount()
+        self.assertEqual(self.counters(self.other)[0], 5)
+
+
+class ProjectionTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='member', password='password123')
+        project_user = ProjectUser.objects.create(user=user, role='member')
+        project = Project.objects.create(name='Ünïcödé 漢字', description='line\nbreak "quoted" \\  ',
+                                         project_owner=project_user)
+        Project.objects.create(name='No description', project_owner=project_user)
+        Task.objects.create(project=project, name='Assigned', description='→\u2028\u2029', assigned_to=user)
+        Task.objects.create(project=project, name=None, description=None)
+        Milestone.objects.create(project=project, name='Due  ', due_date=date(2024, 2, 29))
+
+    def assertSameJSON(self, plan, serializer_class, projection, fields=None):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        queryset = plan.queryset().order_by('id')
+        kwargs = {'fields': fields} if fields else {}
+        expected = JSONRenderer().render(serializer_class(queryset, many=True, **kwargs).data)
+        data = projection.render(projection.values(queryset, fields), fields)
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        with mock.patch('core.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+
+    def test_projections_render_identical_json(self):
+        from . import projections, queries
+        self.assertSameJSON(queries.PROJECT_LIST, ProjectSerializer, projections.PROJECT_LIST)
+        self.assertSameJSON(queries.TASK_LIST, TaskSerializer, projections.TASK_LIST)
+        self.assertSameJSON(queries.MILESTONE_LIST, MilestoneSerializer, projections.MILESTONE_LIST)
+        self.assertSameJSON(queries.TASK_LIST, TaskSerializer, projections.TASK_LIST, ['name', 'assigned_to'])
+
+    def test_renderer_matches_drf_for_other_types(self):
+        from datetime import datetime, timezone as dt_timezone
+        from decimal import Decimal
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        data = {'when': datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc), 'amount': Decimal('1.5'),
+                1: [True, None], 'big': 2 ** 70}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+@override_settings(CORE_SYNC_OVERLAP=0)
+class ChangesFeedTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.user = User.objects.create_user(username='admin', email='admin@example.com', password='password123')
+        self.project_user = ProjectUser.objects.create(user=self.user, role='admin')
+        ProjectUser.objects.create(user=self.user, role='manager')
+        ProjectUser.objects.create(user=self.user, role='member')
+        self.project = Project.objects.create(name='Test Project', project_owner=self.project_user)
+        self.tasks = [Task.objects.create(project=self.project, name=f'Task {i}') for i in range(5)]
+        self.client.force_authenticate(self.user)
+
+    def sync(self, token=None):
+        response = self.client.get('/core/changes', {'since': token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_incremental_sync_returns_only_churn(self):
+        token = self.sync()['next']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put('/core/taskbulkupdate', [{'id': self.tasks[0].id, 'name': 'Renamed'}], format='json')
+            self.client.delete('/core/taskbulkdelete', {'ids': [self.tasks[1].id]}, format='json')
+            self.client.post('/core/taskcreate', {'project': self.project.id, 'name': 'New'}, format='json')
+        data = self.sync(token)
+        self.assertEqual([task['name'] for task in data['changes']['tasks']], ['Renamed', 'New'])
+        self.assertEqual(data['changes']['projects'], [])
+        self.assertEqual(data['deleted'], {'projects': [], 'tasks': [self.tasks[1].id], 'milestones': []})
+        self.assertFalse(data['has_more'])
+
+        # A cascade leaves a tombstone for every row it removes
+        remaining = list(Task.objects.order_by('id').values_list('id', flat=True))
+        project_id = self.project.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.delete()
+        deleted = self.sync(data['next'])['deleted']
+        self.assertEqual(deleted['projects'], [project_id])
+        self.assertEqual(sorted(deleted['tasks']), remaining)
+
+    def test_deleting_an_assignee_invalidates_its_projects_tasks(self):
+        assignee = User.objects.create_user(username='assignee', password='password123')
+        other = Project.objects.create(name='Other Project', project_owner=self.project_user)
+        Task.objects.filter(pk=self.tasks[0].pk).update(assigned_to=assignee)
+        before = get_generations((Task,)) + get_generations((Task,), scope=self.project.id)
+        untouched = get_generations((Task,), scope=other.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            assignee.delete()
+        after = get_generations((Task,)) + get_generations((Task,), scope=self.project.id)
+        self.assertTrue(all(new != old for new, old in zip(after, before)))
+        self.assertEqual(get_generations((Task,), scope=other.id), untouched)
+        self.assertIsNone(Task.objects.get(pk=self.tasks[0].pk).assigned_to)
+
+    def test_queryset_deletes_write_tombstones_in_one_insert(self):
+        tasks = Task.objects.bulk_create(Task(project=self.project, name=f'Bulk {i}') for i in range(100))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.delete('/core/taskbulkdelete', {'ids': [task.id for task in tasks]},
+                                          format='json')
+        self.assertEqual(response.status_code, 200)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "core_tombstone"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertLess(len(queries), 15)
+
+        # Cascades of a queryset delete are batched per model too
+        with CaptureQueriesContext(connection) as queries:
+            Project.objects.filter(pk=self.project.pk).delete()
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "core_tombstone"')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(Tombstone.objects.filter(kind='task').count(), 105)
+        self.assertEqual(Tombstone.objects.filter(kind='project').count(), 1)
+
+    def test_project_delete_endpoint_batches_its_cascade(self):
+        def delete(tasks, milestones):
+            project = Project.objects.create(name='Doomed', project_owner=self.project_user)
+            Task.objects.bulk_create(Task(project=project, name=f'Task {i}') for i in range(tasks))
+            Milestone.objects.bulk_create(Milestone(project=project, name=f'M{i}', due_date=date.today())
+                                          for i in range(milestones))
+            cache.clear()
+            role_cache.clear()
+            with CaptureQueriesContext(connection) as queries, \
+                    self.captureOnCommitCallbacks(execute=True) as callbacks:
+                response = self.client.delete('/core/projectdelete', {'id': project.id}, format='json')
+            self.assertEqual(response.status_code, 204)
+            inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "core_tombstone"')]
+            return len(inserts), len(queries), len(callbacks)
+
+        small = delete(1, 1)
+        self.assertEqual(small[0], 3)
+        self.assertEqual(delete(50, 20), small)
+        self.assertEqual(Tombstone.objects.filter(kind='task').count(), 51)
+        self.assertEqual(Tombstone.objects.filter(kind='milestone').count(), 21)
+
+        response = self.client.delete('/core/projectdelete', {'id': 0}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(CORE_SYNC_PAGE_SIZE=2)
+    def test_pages_through_a_full_sync(self):
+        seen, data = [], {'next': None, 'has_more': True}
+        while data['has_more']:
+            data = self.sync(data['next'])
+            seen += [task['id'] for task in data['changes']['tasks']]
+        self.assertEqual(seen, [task.id for task in self.tasks])
+
+    def test_rejects_bad_and_expired_tokens(self):
+        from . import changes
+        response = self.client.get('/core/changes', {'since': 'forged'})
+        self.assertEqual(response.status_code, 400)
+        old = timezone.now() - timedelta(days=settings.CORE_TOMBSTONE_DAYS + 1)
+        token = changes.encode_token({key: (old, 0) for key in [*changes.FEEDS, 'deleted']})
+        response = self.client.get('/core/changes', {'since': token})
+        self.assertEqual(response.status_code, 410)
+
+
+class ProjectSummaryTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.user = User.objects.create_user(username='admin', email='admin@example.com', password='password123')
+        self.other_user = User.objects.create_user(username='other', password='password123')
+        self.project_user = ProjectUser.objects.create(user=self.user, role='admin')
+        ProjectUser.objects.create(user=self.user, role='manager')
+        ProjectUser.objects.create(user=self.user, role='member')
+        self.project = Project.objects.create(name='Test Project', project_owner=self.project_user)
+        self.other = Project.objects.create(name='Other Project', project_owner=self.project_user)
+        today = date.today()
+        Task.objects.bulk_create(
+            [Task(project=self.project, name=f'Task {i}', assigned_to=(self.user, self.other_user, None)[i % 3])
+             for i in range(7)]
+        )
+        Milestone.objects.bulk_create(
+            [Milestone(project=self.project, name=f'M{days}', due_date=today + timedelta(days=days))
+             for days in (-10, -1, 0, 3, 30)]
+        )
+        counters.recount()
+        self.client.force_authenticate(self.user)
+
+    def summary(self, project):
+        response = self.client.get(f'/core/project/{project.id}/summary')
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']
+
+    def test_aggregates(self):
+        data = self.summary(self.project)
+        self.assertEqual((data['project']['task_count'], data['project']['milestone_count']), (7, 5))
+        self.assertEqual(sorted((row['assigned_to'] or 0, row['tasks']) for row in data['tasks_by_assignee']),
+                         sorted([(self.user.id, 3), (self.other_user.id, 2), (0, 2)]))
+        self.assertEqual(data['milestones'], {'overdue': 2, 'upcoming': 3, 'due_this_week': 2})
+        self.assertEqual([m['name'] for m in data['upcoming_milestones']], ['M0', 'M3', 'M30'])
+        self.assertEqual([m['name'] for m in data['overdue_milestones']], ['M-1', 'M-10'])
+        response = self.client.get('/core/project/0/summary')
+        self.assertEqual(response.status_code, 404)
+
+    def test_query_count_is_constant(self):
+        def count(project):
+            cache.clear()
+            role_cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.summary(project)
+            return len(queries)
+        small = count(self.other)
+        Task.objects.bulk_create([Task(project=self.other, name=f'Task {i}', assigned_to=self.user)
+                                  for i in range(200)])
+        Milestone.objects.bulk_create([Milestone(project=self.other, name='M', due_date=date.today())
+                                       for _ in range(50)])
+        self.assertEqual(count(self.other), small)
+
+    def test_cached_per_project_until_its_rows_change(self):
+        self.summary(self.project)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/core/taskcreate', {'project': self.other.id, 'name': 'Elsewhere'}, format='json')
+        with self.assertNumQueries(0):
+            self.summary(self.project)
+
+        # Moving a task out of the project invalidates both summaries
+        task = Task.objects.filter(project=self.project).first()
+        self.summary(self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put('/core/taskupdate', {'id': task.id, 'project': self.other.id}, format='json')
+        self.assertEqual(self.summary(self.project)['project']['task_count'], 6)
+        self.assertEqual(self.summary(self.other)['project']['task_count'], 2)
@@ -1,17 +1,37 @@
 from django.urls import path
-from .views import *
+from .routing import lazy_view
+
 urlpatterns=[
-    path('project',ProjectView.as_view(),                   name='project-view'),
-    path('projectcreate',ProjectCreate.as_view(),           name='projectcreate'),
-    path('projectupdate',ProjectUpdate.as_view(),           name='projectupdate'),
-    path('projectdelete',ProjectDelete.as_view(),           name='projectdelete'),
-    path('taskcreate',TaskCreation.as_view(),               name='taskcreate'),
-    path('taskdelete',TaskDeletion.as_view(),               name='taskdelete'),
-    path('taskview',TaskView.as_view(),                     name='taskview'),
-    path('taskupdate',TaskUpdate.as_view(),                 name='taskupdate'),
-    path('milestoneview',MilestoneView.as_view(),           name='milestoneview'),
-    path('milestonecreate',MilestoneCreate.as_view(),       name='milestonecreate'),
-    path('milestoneupdate',MilestoneUpdate.as_view(),       name='milestoneupdate'),
-    path('milestonedelete',MilestoneDelete.as_view(),       name='milestonedelete')
+    path('project',lazy_view('core.views.ProjectView'),                     name='project-view'),
+    path('project/<int:id>/summary',lazy_view('core.views.ProjectSummary'), name='projectsummary'),
+    path('projectcreate',lazy_view('core.views.ProjectCreate'),             name='projectcreate'),
+    path('projectupdate',lazy_view('core.views.ProjectUpdate'),             name='projectupdate'),
+    path('projectdelete',lazy_view('core.views.ProjectDelete'),             name='projectdelete'),
+    path('taskcreate',lazy_view('core.views.TaskCreation'),                 name='taskcreate'),
+    path('taskdelete',lazy_view('core.views.TaskDeletion'),                 name='taskdelete'),
+    path('taskview',lazy_view('core.views.TaskView'),                       name='taskview'),
+    path('taskupdate',lazy_view('core.views.TaskUpdate'),                   name='taskupdate'),
+    path('milestoneview',lazy_view('core.views.MilestoneView'),             name='milestoneview'),
+    path('milestonecreate',lazy_view('core.views.MilestoneCreate'),         name='milestonecreate'),
+    path('milestoneupdate',lazy_view('core.views.MilestoneUpdate'),         name='milestoneupdate'),
+    path('milestonedelete',lazy_view('core.views.MilestoneDelete'),         name='milestonedelete'),
+    path('taskbulkcreate',lazy_view('core.views.TaskBulkCreate'),           name='taskbulkcreate'),
+    path('taskbulkupdate',lazy_view('core.views.TaskBulkUpdate'),           name='taskbulkupdate'),
+    path('taskbulkdelete',lazy_view('core.views.TaskBulkDelete'),           name='taskbulkdelete'),
+    path('milestonebulkcreate',lazy_view('core.views.MilestoneBulkCreate'), name='milestonebulkcreate'),
+    path('milestonebulkupdate',lazy_view('core.views.MilestoneBulkUpdate'), name='milestonebulkupdate'),
+    path('milestonebulkdelete',lazy_view('core.views.MilestoneBulkDelete'), name='milestonebulkdelete'),
+    path('notificationview',lazy_view('core.views.NotificationView'),       name='notificationview'),
+    path('notificationcount',lazy_view('core.views.NotificationCount'),     name='notificationcount'),
+    path('notificationread',lazy_view('core.views.NotificationRead'),       name='notificationread'),
+    path('eventstream',lazy_view('core.async_views.EventStream', is_async=True, csrf_exempt=False),name='eventstream'),
+    path('asyncproject',lazy_view('core.async_views.AsyncProjectView', is_async=True, csrf_exempt=False),name='asyncproject'),
+    path('asynctaskview',lazy_view('core.async_views.AsyncTaskView', is_async=True, csrf_exempt=False),name='asynctaskview'),
+    path('asyncmilestoneview',lazy_view('core.async_views.AsyncMilestoneView', is_async=True, csrf_exempt=False),name='asyncmilestoneview'),
+    path('changes',lazy_view('core.views.ChangesView'),                     name='changes'),
+    path('projectexport',lazy_view('core.views.ProjectExport'),             name='projectexport'),
+    path('taskexport',lazy_view('core.views.TaskExport'),                   name='taskexport'),
+    path('milestoneexport',lazy_view('core.views.MilestoneExport'),         name='milestoneexport'),
+    path('metrics',lazy_view('core.instrumentation.MetricsView', csrf_exempt=False),name='metrics'),
 
-]
\ No newline at end of file
+]
@@ -1,21 +1,23 @@
+from datetime import date
 from django.shortcuts import render
 from rest_framework.views import APIView
-from .models import *
-from .serializers import *
+from .models import Project, Task, Milestone, Notification
+from .serializers import ProjectSerializer, TaskSerializer, MilestoneSerializer, NotificationSerializer
 from rest_framework.response import Response
 from rest_framework import status
 from django.core.exceptions import ObjectDoesNotExist
-from .permissions import *
+from .permissions import AdminPermission, ManagerPermission, MemberPermission
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import PageNumberPagination
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from rest_framework.exceptions import NotFound, ValidationError
 from django.core.paginator import Paginator
-
-class CustomPageNumberPagination(PageNumberPagination): # for pagination
-    page_size = 3
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+from django.conf import settings
+from django.db import transaction
+from .cache import versioned_cache
+from .pagination import CustomPageNumberPagination, ListPageNumberPagination, KeysetPagination, get_paginator
+from .notifications import unread_count, mark_read
+from . import changes, exports, filters, projections, queries, summary
+from .signals import bulk_post_save
+from .streaming import streaming_response
 
 class ProjectView(APIView): 
     """
@@ -25,20 +27,22 @@ class ProjectView(APIView):
     """ 
     permission_classes=[IsAuthenticated,MemberPermission]
     
-    @method_decorator(cache_page(60 * 15))  # Cache set for 15 minutes
+    @versioned_cache(Project)  # Cached per user until a project changes
     def get(self,request):
         try:
-            projects = Project.objects.all()
+            projects = queries.PROJECT_LIST.queryset().order_by('id')
             
-            # Paginate the project objects
-            paginator = CustomPageNumberPagination()
-            result_page = paginator.paginate_queryset(projects, request)
-            serializer = ProjectSerializer(result_page, many=True)
+            # Paginate the project rows
+            paginator = get_paginator(request, CustomPageNumberPagination)
+            result_page = paginator.paginate_queryset(projections.PROJECT_LIST.values(projects), request)
             response_data = {
-                'data': serializer.data,
+                'data': projections.PROJECT_LIST.render(result_page),
                 'message': 'Success'
             }
             return paginator.get_paginated_response(response_data)
+        except NotFound as e:
+            return Response({'Status':False,'Message':str(e.detail)},
+                            status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             # Print the exception for debugging purposes
             print(e)
@@ -46,6 +50,28 @@ class ProjectView(APIView):
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class ProjectSummary(APIView):
+    """
+    ProjectSummary handles GET requests for a project's dashboard: tasks per
+    assignee and its upcoming and overdue milestones (see core/summary.py).
+    Only authenticated users with member permissions can access this view.
+
+    """
+    permission_classes=[IsAuthenticated,MemberPermission]
+
+    def get(self, request, id):
+        try:
+            data = summary.project_summary(id)
+            if data is None:
+                return Response({"Status":False,'message':'Object doesnot exist'},
+                                status=status.HTTP_404_NOT_FOUND)
+            return Response({'data': data, 'message': 'Success'}, status=status.HTTP_200_OK)
+        except Exception as e:
+            print(e)
+            return Response({'Status':False,'Message':'Something unexpected occured'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class ProjectCreate(APIView):
     """
     ProjectCreate handles POST requests to create a new project.
@@ -130,14 +156,13 @@ class ProjectDelete(APIView):
                 id = int(id)
             except ValueError:
                 return Response({'message':'id should be an integer value'})
-            project = Project.objects.get(id=id)
 
-            # Delete the project
-            project.delete()
+            # Delete the project, its tasks and milestones batched per model
+            _, deleted = Project.objects.filter(id=id).delete_batch()
+            if not deleted:
+                return Response({"Status":False,'message':'Object doesnot exist'},
+                                status=status.HTTP_404_NOT_FOUND)
             return Response(status=status.HTTP_204_NO_CONTENT)
-        except ObjectDoesNotExist:
-            data = {"Status":False,'message':'Object doesnot exist'}
-            return Response(data=data,status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'Status':False,'Message':'Something unexpected occured'},
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -151,17 +176,21 @@ class TaskView(APIView):
     """
     permission_classes = [IsAuthenticated, MemberPermission]
 
-    @method_decorator(cache_page(60 * 15))  
+    @versioned_cache(Task)
     def get(self, request):
         try:
 
-            # Initialize the paginator with a page size of 10
-            paginator = PageNumberPagination()
-            paginator.page_size = 10  
-            tasks = Task.objects.all()
-            result_page = paginator.paginate_queryset(tasks, request)
-            serializer = TaskSerializer(result_page, many=True)
-            return paginator.get_paginated_response(serializer.data)
+            # Page numbers by default, keyset on id for cursor clients
+            paginator = get_paginator(request, ListPageNumberPagination)
+            tasks, fields = filters.TASK_FILTER.apply(queries.TASK_LIST.queryset(), request)
+            rows = projections.TASK_LIST.values(tasks.order_by('id'), fields)
+            result_page = paginator.paginate_queryset(rows, request)
+            return paginator.get_paginated_response(projections.TASK_LIST.render(result_page, fields))
+        except ValidationError as e:
+            return Response({'Status':False,'error':e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except NotFound as e:
+            return Response({'Status':False,'Message':str(e.detail)},
+                            status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             print(e)
             # Return an error response in case of an exception
@@ -183,7 +212,9 @@ class TaskCreation(APIView):
 
             # Check if the provided data is valid
             if serializer.is_valid():
-                task = serializer.save()
+                # The task and its project's counters together
+                with transaction.atomic():
+                    task = serializer.save()
                 return Response({"Status":True,'message':'Task created successfully',},
                                 status=status.HTTP_201_CREATED)
             return Response({"Status":False,'error':serializer.errors},
@@ -214,7 +245,8 @@ class TaskDeletion(APIView):
             except ValueError:
                 return Response({'message':'id should be an integer value'})
             tasks = Task.objects.get(id=id)
-            tasks.delete()
+            with transaction.atomic():
+                tasks.delete()
             return Response({'message':'Task deleted successfully'},
                             status=status.HTTP_200_OK)
         except ObjectDoesNotExist:
@@ -242,12 +274,13 @@ class TaskUpdate(APIView):
                     id = int(id)
                 except ValueError:
                     return Response({'message':'id should be an integer value'})
-                task = Task.objects.get(pk=id)
+                task = queries.TASK_WRITE.queryset().get(pk=id)
                 serializer = TaskSerializer(task, data=request.data, partial=True)
 
                 # Check if the provided data is valid
                 if serializer.is_valid():
-                    serializer.save()
+                    with transaction.atomic():
+                        serializer.save()
                     return Response({"Status":True,'message': 'Task updated successfully'},
                                     status=status.HTTP_200_OK)
                 return Response({"Status":False,'error': serializer.errors},
@@ -269,14 +302,21 @@ class MilestoneView(APIView):
     """
     permission_classes = [IsAuthenticated,MemberPermission]
 
+    @versioned_cache(Milestone)
     def get(self, request):
         try:
-            paginator = PageNumberPagination()
-            paginator.page_size = 10  
-            milestones = Milestone.objects.all()
-            result_page = paginator.paginate_queryset(milestones, request)
-            serializer = MilestoneSerializer(result_page, many=True)
-            return paginator.get_paginated_response(serializer.data)
+            ordering = ('due_date', 'id')
+            paginator = get_paginator(request, ListPageNumberPagination, ordering=ordering)
+            milestones, fields = filters.MILESTONE_FILTER.apply(queries.MILESTONE_LIST.queryset(), request,
+                                                                ordering)
+            rows = projections.MILESTONE_LIST.values(milestones.order_by('id'), fields, ordering)
+            result_page = paginator.paginate_queryset(rows, request)
+            return paginator.get_paginated_response(projections.MILESTONE_LIST.render(result_page, fields))
+        except ValidationError as e:
+            return Response({'Status':False,'error':e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        except NotFound as e:
+            return Response({'Status':False,'Message':str(e.detail)},
+                            status=status.HTTP_404_NOT_FOUND)
         except ObjectDoesNotExist:
             return Response({"Status":False,'message': 'No milestones found'}, 
                             status=status.HTTP_404_NOT_FOUND)
@@ -298,7 +338,8 @@ class MilestoneCreate(APIView):
         try:
             serializer = MilestoneSerializer(data=request.data)
             if serializer.is_valid():
-                milestone = serializer.save()
+                with transaction.atomic():
+                    milestone = serializer.save()
                 return Response({"Status":True,'message': 'Milestone created successfully'}, 
                                 status=status.HTTP_201_CREATED)
             return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -326,10 +367,11 @@ class MilestoneUpdate(APIView):
             except ValueError:
                 return Response({"Status":False,'Message':'Id should be a valid integer'},
                                 status=status.HTTP_400_BAD_REQUEST)
-            milestone = Milestone.objects.get(id=id)
+            milestone = queries.MILESTONE_WRITE.queryset().get(id=id)
             serializer = MilestoneSerializer(milestone, data=request.data, partial=True)
             if serializer.is_valid():
-                serializer.save()
+                with transaction.atomic():
+                    serializer.save()
                 return Response({'Status':True,'message':'milestone updated successfully'},
                                 status=status.HTTP_200_OK)
             return Response({'Status':False,'error':serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
@@ -359,7 +401,8 @@ class MilestoneDelete(APIView):
             except ValueError:
                 return Response({'message':'id should be an integer value'})
             milestone = Milestone.objects.get(id=id)
-            milestone.delete()
+            with transaction.atomic():
+                milestone.delete()
             return Response({'message': 'Milestone deleted successfully'},
                             status=status.HTTP_204_NO_CONTENT)
         except Milestone.DoesNotExist:
@@ -367,4 +410,356 @@ class MilestoneDelete(APIView):
                             status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'Status':False,'Message':'Something unexpected occured'},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def parse_ids(values):
+    """
+    Convert a list of ids from the request body to integers, or return None
+    if it is not a list of integers.
+    """
+    if not isinstance(values, list):
+        return None
+    try:
+        return [int(value) for value in values]
+    except (TypeError, ValueError):
+        return None
+
+
+def bulk_errors(serializer):
+    """
+    The body of a 400 for an invalid batch: the per-item errors and, by
+    field, the referenced ids that do not exist.
+    """
+    data = {"Status":False,'error':serializer.errors}
+    if serializer.missing_keys:
+        data['missing'] = serializer.missing_keys
+    return data
+
+
+class BulkCreateView(APIView):
+    """
+    Base view for batch creation: the request body is a list of objects,
+    validated in one pass and inserted with bulk_create in one transaction.
+    """
+    serializer_class = None
+
+    def post(self, request):
+        try:
+            serializer = self.serializer_class(data=request.data, many=True,
+                                               max_length=settings.CORE_BULK_MAX_ITEMS)
+            if serializer.is_valid():
+                with transaction.atomic():
+                    objects = serializer.save()
+                    bulk_post_save(self.serializer_class.Meta.model, objects, created=True)
+                results = [{'index': index, 'id': obj.id} for index, obj in enumerate(objects)]
+                return Response({"Status":True,'message':'Created successfully','results':results},
+                                status=status.HTTP_201_CREATED)
+            return Response(bulk_errors(serializer),
+                            status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            print(e)
+            return Response({'Status':False,'Message':'Something unexpected occured'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BulkUpdateView(APIView):
+    """
+    Base view for batch updates: the request body is a list of partial
+    objects, each with its ``id``. Instances are fetched in one query and
+    written with bulk_update in one transaction.
+    """
+    serializer_class = None
+    query_plan = None
+
+    def put(self, request):
+        try:
+            if not isinstance(request.data, list) or len(request.data) > settings.CORE_BULK_MAX_ITEMS:
+                return Response({"Status":False,'message':
+                                 f'Expected a list of at most {settings.CORE_BULK_MAX_ITEMS} objects'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            ids = parse_ids([item.get('id') if isinstance(item, dict) else None
+                             for item in request.data])
+            if ids is None:
+                return Response({"Status":False,'message':'Every object needs an integer id'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if len(set(ids)) != len(ids):
+                return Response({"Status":False,'message':'Duplicate ids in request'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            model = self.serializer_class.Meta.model
+            instances = self.query_plan.queryset().in_bulk(ids)
+            if len(instances) != len(ids):
+                errors = [{} if id in instances else {'id': ['Object doesnot exist']} for id in ids]
+                return Response({"Status":False,'error':errors},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            serializer = self.serializer_class(instances, data=request.data, many=True, partial=True)
+            if serializer.is_valid():
+                with transaction.atomic():
+                    objects = serializer.save()
+                    bulk_post_save(model, objects, created=False)
+                results = [{'index': index, 'id': obj.id} for index, obj in enumerate(objects)]
+                return Response({"Status":True,'message':'Updated successfully','results':results},
+                                status=status.HTTP_200_OK)
+            return Response(bulk_errors(serializer),
+                            status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            print(e)
+            return Response({'Status':False,'Message':'Something unexpected occured'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class BulkDeleteView(APIView):
+    """
+    Base view for batch deletion: the request body is ``{"ids": [...]}``.
+    Returns which ids were deleted and which did not exist.
+    """
+    model = None
+
+    def delete(self, request):
+        try:
+            ids = parse_ids(request.data.get('ids')) if hasattr(request.data, 'get') else None
+            if ids is None or len(ids) > settings.CORE_BULK_MAX_ITEMS:
+                return Response({"Status":False,'message':
+                                 f'ids should be a list of at most {settings.CORE_BULK_MAX_ITEMS} integers'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            # Counters, cache invalidation and events once for the batch
+            _, deleted = self.model.objects.filter(id__in=ids).delete_batch()
+            results = [{'id': id, 'deleted': id in deleted} for id in ids]
+            return Response({"Status":True,'message':'Deleted successfully','results':results},
+                            status=status.HTTP_200_OK)
+        except Exception as e:
+            print(e)
+            return Response({'Status':False,'Message':'Something unexpected occured'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class TaskBulkCreate(BulkCreateView):
+    """
+    TaskBulkCreate handles POST requests to create a batch of tasks.
+    Only authenticated users with admin permissions can access this view.
+
+    """
+    permission_classes = [IsAuthenticated,AdminPermission]
+    serializer_class = TaskSerializer
+
+
+class TaskBulkUpdate(BulkUpdateView):
+    """
+    TaskBulkUpdate handles PUT requests to update a batch of tasks.
+    Only authenticated users with manager permissions can access this view.
+
+    """
+    permission_classes = [IsAuthenticated,ManagerPermission]
+    serializer_class = TaskSerializer
+    query_plan = queries.TASK_WRITE
+
+
+class TaskBulkDelete(BulkDeleteView):
+    """
+    TaskBulkDelete handles DELETE requests to delete a batch of tasks.
+    Only authenticated users with admin permissions can access this view.
+
+    """
+    permission_classes = [IsAuthenticated,AdminPermission]
+    model = Task
+
+
+class MilestoneBulkCreate(BulkCreateView):
+    """
+    MilestoneBulkCreate handles POST requests to create a batch of milestones.
+    Only authenticated users with admin permissions can access this view.
+
+    """
+    permission_classes = [IsAuthenticated,AdminPermission]
+    serializer_class = MilestoneSerializer
+
+
+class MilestoneBulkUpdate(BulkUpdateView):
+    """
+    MilestoneBulkUpdate handles PUT requests to update a batch of milestones.
+    Only authenticated users with manager permissions can access this view.
+
+    """
+    permission_classes = [IsAuthenticated,ManagerPermission]
+    serializer_class = MilestoneSerializer
+    query_plan = queries.MILESTONE_WRITE
+
+
+class MilestoneBulkDelete(BulkDeleteView):
+    """
+    MilestoneBulkDelete handles DELETE requests to delete a batch of milestones.
+    Only authenticated users with admin permissions can access this view.
+
+    """
+    permission_classes = [IsAuthenticated,AdminPermission]
+    model = Milestone
+
+
+class NotificationView(APIView):
+    """
+    NotificationView handles GET requests to retrieve the requesting user's
+    notifications, newest first, with cursor pagination.
+    Pass ``unread=true`` to list unread notifications only.
+
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            notifications = Notification.objects.filter(user=request.user.id)
+            if request.query_params.get('unread') == 'true':
+                notifications = notifications.filter(is_read=False)
+            paginator = KeysetPagination(ordering=('-created_at', '-id'))
+            result_page = paginator.paginate_queryset(notifications, request)
+            serializer = NotificationSerializer(result_page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+        except NotFound as e:
+            return Response({'Status':False,'Message':str(e.detail)},
+                            status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            print(e)
+            return Response({'Status':False,'Message':'Something unexpected occured'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class NotificationCount(APIView):
+    """
+    NotificationCount handles GET requests for the requesting user's number
+    of unread notifications.
+
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            return Response({'Status':True,'unread':unread_count(request.user.id)},
+                            status=status.HTTP_200_OK)
+        except Exception as e:
+            print(e)
+            return Response({'Status':False,'Message':'Something unexpected occured'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class NotificationRead(APIView):
+    """
+    NotificationRead handles PUT requests to mark notifications as read.
+    The body is ``{"ids": [...]}``, or ``{"all": true}`` for the whole inbox.
+
+    """
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request):
+        try:
+            if request.data.get('all') is True:
+                ids = None
+            else:
+                ids = parse_ids(request.data.get('ids'))
+                if ids is None:
+                    return Response({"Status":False,'message':'ids should be a list of integers'},
+                                    status=status.HTTP_400_BAD_REQUEST)
+            updated = mark_read(request.user.id, ids)
+            return Response({'Status':True,'updated':updated,'unread':unread_count(request.user.id)},
+                            status=status.HTTP_200_OK)
+        except Exception as e:
+            print(e)
+            return Response({'Status':False,'Message':'Something unexpected occured'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ChangesView(APIView):
+    """
+    ChangesView handles GET requests for the projects, tasks and milestones
+    created, updated or deleted since the ``since`` token of a previous
+    response (see core/changes.py). Without ``since`` it starts a full sync.
+    Only authenticated users with member permissions can access this view.
+
+    """
+    permission_classes = [IsAuthenticated,MemberPermission]
+
+    @versioned_cache(Project, Task, Milestone)
+    def get(self, request):
+        try:
+            return Response(changes.changes(request.query_params.get('since')),
+                            status=status.HTTP_200_OK)
+        except changes.InvalidToken as e:
+            return Response({'Status':False,'error':{'since':[str(e)]}},
+                            status=status.HTTP_400_BAD_REQUEST)
+        except changes.ExpiredToken as e:
+            return Response({'Status':False,'Message':'Sync token expired, start a full sync without since'},
+                            status=status.HTTP_410_GONE)
+        except Exception as e:
+            print(e)
+            return Response({'Status':False,'Message':'Something unexpected occured'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ExportView(APIView):
+    """
+    Base view for the streaming exports. Query parameters: ``output``
+    (``ndjson``, the default, or ``csv``; DRF reserves ``format``), ``project`` and, for exports with
+    a date column, ``from``/``to`` as ISO dates.
+    """
+    export = None
+
+    def get(self, request):
+        try:
+            output = request.query_params.get('output', 'ndjson')
+            if output not in ('ndjson', 'csv'):
+                return Response({"Status":False,'message':'output should be ndjson or csv'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            try:
+                project = request.query_params.get('project')
+                project = int(project) if project else None
+                date_from, date_to = (request.query_params.get(name) for name in ('from', 'to'))
+                date_from = date.fromisoformat(date_from) if date_from else None
+                date_to = date.fromisoformat(date_to) if date_to else None
+            except ValueError:
+                return Response({"Status":False,'message':'project should be an integer and from/to ISO dates'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            rows = self.export.rows(project, date_from, date_to)
+            name = self.export.model._meta.verbose_name_plural.replace(' ', '_')
+            # A chunk of lines per thread hop under ASGI
+            batch = settings.CORE_EXPORT_CHUNK_SIZE
+            if output == 'csv':
+                response = streaming_response(request, self.export.csv(rows), 'text/csv', batch)
+                response['Content-Disposition'] = f'attachment; filename="{name}.csv"'
+            else:
+                response = streaming_response(request, self.export.ndjson(rows), 'application/x-ndjson', batch)
+            return response
+        except Exception as e:
+            print(e)
+            return Response({'Status':False,'Message':'Something unexpected occured'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ProjectExport(ExportView):
+    """
+    ProjectExport handles GET requests to stream every project.
+    Only authenticated users with member permissions can access this view.
+
+    """
+    permission_classes = [IsAuthenticated,MemberPermission]
+    export = exports.PROJECTS
+
+
+class TaskExport(ExportView):
+    """
+    TaskExport handles GET requests to stream every task.
+    Only authenticated users with member permissions can access this view.
+
+    """
+    permission_classes = [IsAuthenticated,MemberPermission]
+    export = exports.TASKS
+
+
+class MilestoneExport(ExportView):
+    """
+    MilestoneExport handles GET requests to stream every milestone.
+    Only authenticated users with member permissions can access this view.
+
+    """
+    permission_classes = [IsAuthenticated,MemberPermission]
+    export = exports.MILESTONES
@@ -2,6 +2,9 @@
 ASGI config for projectmanagement project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the project with it (e.g. ``uvicorn projectmanagement.asgi:application``)
+to use the ``core/eventstream`` Server-Sent Events endpoint, which keeps one
+long-lived response per client without tying up a worker thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -1,7 +1,20 @@
 import os
 from celery import Celery
+from celery.schedules import crontab
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "projectmanagement.settings")
 app = Celery("projectmanagement")
 app.config_from_object("django.conf:settings", namespace="CELERY")
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+app.conf.beat_schedule = {
+    # Move Project.next_due_date past milestones that fell due yesterday
+    'refresh-project-due-dates': {
+        'task': 'core.tasks.refresh_project_due_dates',
+        'schedule': crontab(hour=0, minute=5),
+    },
+    # Drop tombstones older than CORE_TOMBSTONE_DAYS
+    'purge-tombstones': {
+        'task': 'core.tasks.purge_tombstones',
+        'schedule': crontab(hour=0, minute=20),
+    },
+}
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -51,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,12 +83,24 @@ TEMPLATES = [
 WSGI_APPLICATION = 'projectmanagement.wsgi.application'
 
 
+# FastJSONRenderer (core/renderers.py) renders the same bytes as DRF's
+# JSONRenderer, through orjson when it is installed.
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.ClaimsJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 }
 
+# Stateless access tokens (see core/authentication.py): LoginView puts the
+# roles and a token generation into the claims, so authenticated requests
+# need no user or group queries. The generation is cached for this long.
+CORE_STATELESS_AUTH = os.getenv('CORE_STATELESS_AUTH', 'true').lower() == 'true'
+CORE_TOKEN_GENERATION_TTL = int(os.getenv('CORE_TOKEN_GENERATION_TTL', 24 * 60 * 60))
+
 
 
 CACHES = {
@@ -96,15 +110,101 @@ CACHES = {
     }
 }
 
+# Lifetime of the versioned list-view cache (see core/cache.py). Entries are
+# invalidated on write, so this only bounds how long orphaned keys linger.
+CORE_CACHE_TIMEOUT = int(os.getenv('CORE_CACHE_TIMEOUT', 60 * 60))
+
+# Role lookups for the permission classes (see core/roles.py): seconds in
+# the shared cache, seconds in each process's local LRU, and LRU capacity.
+CORE_ROLE_CACHE_TTL = int(os.getenv('CORE_ROLE_CACHE_TTL', 300))
+CORE_ROLE_CACHE_LOCAL_TTL = int(os.getenv('CORE_ROLE_CACHE_LOCAL_TTL', 10))
+CORE_ROLE_CACHE_SIZE = int(os.getenv('CORE_ROLE_CACHE_SIZE', 4096))
+
+# Default pagination mode of the list views when a request does not choose
+# one: 'page' (page numbers with counts) or 'cursor' (keyset, see
+# core/pagination.py). Clients sending ?page= always get page numbers.
+CORE_PAGINATION_MODE = os.getenv('CORE_PAGINATION_MODE', 'page')
+
+# Batch endpoints: maximum objects per request and rows per INSERT/UPDATE.
+CORE_BULK_MAX_ITEMS = int(os.getenv('CORE_BULK_MAX_ITEMS', 5000))
+CORE_BULK_BATCH_SIZE = int(os.getenv('CORE_BULK_BATCH_SIZE', 500))
+
+# Rows fetched per database round trip by the streaming exports.
+CORE_EXPORT_CHUNK_SIZE = int(os.getenv('CORE_EXPORT_CHUNK_SIZE', 2000))
+
+# Changes feed (see core/changes.py): rows per model in one page, seconds
+# each position is moved back to cover transactions still in flight, and
+# days tombstones (and so sync tokens) are kept.
+CORE_SYNC_PAGE_SIZE = int(os.getenv('CORE_SYNC_PAGE_SIZE', 500))
+CORE_SYNC_OVERLAP = int(os.getenv('CORE_SYNC_OVERLAP', 5))
+CORE_TOMBSTONE_DAYS = int(os.getenv('CORE_TOMBSTONE_DAYS', 30))
+
+# Milestones listed in each of the upcoming and overdue lists of the
+# project summary (see core/summary.py).
+CORE_SUMMARY_MILESTONES = int(os.getenv('CORE_SUMMARY_MILESTONES', 5))
+
+# Notification digests (see core/notifications.py): events are buffered for
+# this many seconds and sent as one email per recipient, GRACE seconds after
+# the window closes.
+NOTIFICATION_DIGEST_WINDOW = int(os.getenv('NOTIFICATION_DIGEST_WINDOW', 60))
+NOTIFICATION_DIGEST_GRACE = int(os.getenv('NOTIFICATION_DIGEST_GRACE', 5))
+
+# Seconds before a user's cached unread-notification counter is rebuilt.
+NOTIFICATION_UNREAD_TTL = int(os.getenv('NOTIFICATION_UNREAD_TTL', 60 * 60))
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# DATABASE_PROFILE picks the backend: 'sqlite' (a local file, the default)
+# or 'postgres'. Connections are kept open for DATABASE_CONN_MAX_AGE seconds
+# and checked before being reused (set it to 0 under ASGI, where every
+# request thread would hold its own connection). Django 5.0 has no built-in
+# pool: for PostgreSQL put PgBouncer in front and set POSTGRES_PGBOUNCER,
+# which turns off the server-side cursors transaction pooling cannot carry.
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "sqlite")
+DATABASE_CONN_MAX_AGE = int(os.getenv("DATABASE_CONN_MAX_AGE", 60))
+
+if DATABASE_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'projectmanagement'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('POSTGRES_PGBOUNCER', 'false').lower() == 'true',
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('POSTGRES_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+elif DATABASE_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
+else:
+    raise ValueError(f"DATABASE_PROFILE should be 'sqlite' or 'postgres', not {DATABASE_PROFILE!r}")
+
+# PRAGMAs run on every new SQLite connection (see core/database.py). WAL
+# lets readers carry on while a write commits, synchronous=NORMAL only
+# syncs at checkpoints in WAL mode (still safe against corruption),
+# mmap_size maps that many bytes of the file instead of reading through
+# the page cache, and busy_timeout makes a writer wait that many
+# milliseconds for the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
 }
 
 REDIS_URL = os.getenv("REDIS_URL", "localhost")
@@ -112,6 +212,60 @@ REDIS_PORT = os.getenv("REDIS_PORT", "6379")
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://"+ REDIS_URL +":6379")
 CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://"+ REDIS_URL +":6379")
 
+# Server-Sent Events (see core/events.py): fan-out backend, Redis pub/sub
+# URL, seconds between keep-alive comments, and seconds between refreshes
+# of a stream's project list.
+CORE_EVENT_BACKEND = os.getenv("CORE_EVENT_BACKEND", "core.events.RedisEventBackend")
+CORE_EVENT_REDIS_URL = os.getenv("CORE_EVENT_REDIS_URL", "redis://"+ REDIS_URL +":"+ REDIS_PORT +"/2")
+CORE_EVENT_HEARTBEAT = int(os.getenv("CORE_EVENT_HEARTBEAT", 15))
+CORE_EVENT_PROJECT_REFRESH = int(os.getenv("CORE_EVENT_PROJECT_REFRESH", 60))
+
+# Request instrumentation (see core/instrumentation.py): fraction of
+# requests measured, whether they get a Server-Timing header, and the bearer
+# token Prometheus uses to scrape /core/metrics.
+CORE_METRICS_SAMPLE_RATE = float(os.getenv("CORE_METRICS_SAMPLE_RATE", 0.05))
+CORE_METRICS_SERVER_TIMING = os.getenv("CORE_METRICS_SERVER_TIMING", "true").lower() == "true"
+CORE_METRICS_TOKEN = os.getenv("CORE_METRICS_TOKEN", "")
+
+# Login pipeline (see user/throttling.py and user/credentials.py): token
+# buckets per client IP and per username (burst size, refill per second),
+# the password hashing pool (threads, waiting jobs) and the PBKDF2 work
+# factor. Hashes with a different work factor are re-encoded on login.
+LOGIN_IP_BURST = int(os.getenv('LOGIN_IP_BURST', 20))
+LOGIN_IP_RATE = float(os.getenv('LOGIN_IP_RATE', 2))
+LOGIN_USERNAME_BURST = int(os.getenv('LOGIN_USERNAME_BURST', 5))
+LOGIN_USERNAME_RATE = float(os.getenv('LOGIN_USERNAME_RATE', 0.2))
+LOGIN_HASH_WORKERS = int(os.getenv('LOGIN_HASH_WORKERS', os.cpu_count() or 2))
+LOGIN_HASH_QUEUE = int(os.getenv('LOGIN_HASH_QUEUE', 2 * LOGIN_HASH_WORKERS))
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 720000))
+
+# Batch provisioning (see user/provisioning.py): rows per transaction,
+# password hashing processes (0 hashes in the request thread) and the
+# largest batch accepted by the API.
+PROVISION_CHUNK_SIZE = int(os.getenv('PROVISION_CHUNK_SIZE', 500))
+PROVISION_PROCESSES = int(os.getenv('PROVISION_PROCESSES', os.cpu_count() or 2))
+PROVISION_MAX_ROWS = int(os.getenv('PROVISION_MAX_ROWS', 10000))
+
+PASSWORD_HASHERS = [
+    'user.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# The test suite runs offline: no Redis cache and no Celery broker.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+if TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+    CELERY_TASK_ALWAYS_EAGER = True
+    CORE_EVENT_BACKEND = 'core.events.InMemoryEventBackend'
+    PASSWORD_PBKDF2_ITERATIONS = 1000
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,90 @@
+"""
+Password verification for the login endpoint.
+
+PBKDF2 is deliberately slow, so it runs in a bounded thread pool
+(``LOGIN_HASH_WORKERS`` threads, ``LOGIN_HASH_QUEUE`` waiting jobs) rather
+than on whatever thread happens to serve the request. ``hashlib`` releases
+the GIL while hashing, so the pool uses real CPU parallelism without the
+pickling and database-connection problems of a process pool. When the pool
+and its queue are full, ``LoginBusy`` is raised straight away and the
+client is asked to retry, instead of more API threads piling up behind the
+hasher.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import user_login_failed
+from django.contrib.auth.hashers import make_password, verify_password
+from django.contrib.auth.models import User
+
+
+class LoginBusy(Exception):
+    pass
+
+
+class HashingPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def _start(self):
+        with self._lock:
+            if self._executor is None:
+                workers = settings.LOGIN_HASH_WORKERS
+                self._slots = threading.BoundedSemaphore(workers + settings.LOGIN_HASH_QUEUE)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='login-hash')
+
+    def run(self, func, *args):
+        """
+        Run ``func(*args)`` in the pool and wait for the result, or raise
+        ``LoginBusy`` if the pool is saturated.
+        """
+        if self._executor is None:
+            self._start()
+        if not self._slots.acquire(blocking=False):
+            raise LoginBusy
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+hashing_pool = HashingPool()
+
+
+def verify_credentials(request, username, password):
+    """
+    Return the active user matching ``username`` and ``password``, or None.
+    Behaves like ``ModelBackend.authenticate``: unknown users cost one hash
+    too, so response times do not reveal which usernames exist.
+    """
+    if not isinstance(username, str) or not isinstance(password, str):
+        return None
+    try:
+        user = User._default_manager.get_by_natural_key(username)
+    except User.DoesNotExist:
+        hashing_pool.run(make_password, password)
+        user = None
+    else:
+        is_correct, must_update = hashing_pool.run(verify_password, password, user.password)
+        if not is_correct or not user.is_active:
+            user = None
+        elif must_update:
+            # Re-encode with the preferred hasher. The token generation
+            # covers the password hash, so tokens issued under the old hash
+            # stop validating once this login stores the new generation;
+            # that happens once per hasher change.
+            user.password = hashing_pool.run(make_password, password)
+            user.save(update_fields=['password'])
+
+    if user is None:
+        user_login_failed.send(sender=__name__, credentials={'username': username}, request=request)
+    return user
@@ -0,0 +1,28 @@
+import os
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the work factor taken from
+    ``PASSWORD_PBKDF2_ITERATIONS``. It keeps the ``pbkdf2_sha256``
+    algorithm name, so existing hashes verify as before; any hash made with
+    a different iteration count (or by another hasher) is re-encoded on the
+    next successful login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+def setup_hashing_worker():
+    """
+    Initializer for password hashing worker processes, which start from a
+    fresh interpreter. Lives here because this module imports no models.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'projectmanagement.settings')
+    django.setup()
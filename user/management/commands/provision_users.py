@@ -0,0 +1,37 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from user.provisioning import ProvisioningError, parse_rows, provision
+
+
+class Command(BaseCommand):
+    help = ('Create users, their ProjectUser and group membership in bulk from a CSV file '
+            '(columns username,email,password,role) or a JSON array.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json'],
+                            help='Input format; taken from the file extension by default')
+        parser.add_argument('--chunk-size', type=int, default=settings.PROVISION_CHUNK_SIZE)
+        parser.add_argument('--processes', type=int, default=settings.PROVISION_PROCESSES,
+                            help='Password hashing processes (0 hashes in this process)')
+
+    def handle(self, *args, **options):
+        input_format = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        try:
+            with open(options['path'], 'rb') as f:
+                rows = parse_rows(f.read(), input_format)
+        except (OSError, ProvisioningError) as e:
+            raise CommandError(e)
+
+        for event in provision(rows, options['chunk_size'], options['processes']):
+            if event['type'] == 'error':
+                self.stderr.write(f"row {event['row']}: {event['errors']}")
+            elif event['type'] == 'progress':
+                self.stdout.write(f"{event['processed']}/{event['total']} processed, "
+                                  f"{event['created']} created, {event['failed']} failed")
+            else:
+                style = self.style.SUCCESS if not event['failed'] else self.style.WARNING
+                self.stdout.write(style(f"Created {event['created']} of {event['total']} users"))
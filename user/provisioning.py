@@ -0,0 +1,150 @@
+"""
+Batch user provisioning.
+
+``provision(rows)`` validates each row with ``ProjectUserSerializer``,
+hashes the passwords of a chunk in parallel across a process pool, then
+inserts the chunk's users, ``ProjectUser``s and group memberships with one
+``bulk_create`` each, in a single transaction per chunk. It yields
+progress and per-row error events as it goes, so the API view and the
+``provision_users`` command can stream them (under ASGI too, see
+``core.streaming``).
+
+The role group ids come from ``core.roles.role_registry``, so no per-user
+group lookups are needed.
+"""
+import csv
+import io
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+
+from core.models import ProjectUser
+from core.roles import role_registry
+from .hashers import setup_hashing_worker
+from .serializers import ProjectUserSerializer
+
+
+COLUMNS = ['username', 'email', 'password', 'role']
+
+
+class ProvisioningError(ValueError):
+    pass
+
+
+def parse_rows(content, format):
+    """
+    Parse a CSV (with a header line) or a JSON array of objects into a list
+    of row dicts.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if format == 'csv':
+        reader = csv.DictReader(io.StringIO(content))
+        missing = set(COLUMNS) - set(reader.fieldnames or [])
+        if missing:
+            raise ProvisioningError(f'CSV header is missing: {", ".join(sorted(missing))}')
+        return list(reader)
+    if format == 'json':
+        try:
+            rows = json.loads(content)
+        except ValueError:
+            raise ProvisioningError('Invalid JSON')
+        if not isinstance(rows, list):
+            raise ProvisioningError('Expected a JSON array of users')
+        return rows
+    raise ProvisioningError('format should be csv or json')
+
+
+def hash_passwords(passwords, pool=None, processes=1):
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    # A few batches per process keeps the pickling overhead low
+    chunksize = max(1, len(passwords) // (4 * processes))
+    return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def validate_chunk(rows, start):
+    """
+    Return ``(valid, errors)``: ``valid`` is a list of ``(row number,
+    validated data)``, ``errors`` a list of error events.
+    """
+    valid, errors, seen = [], [], set()
+    for number, row in enumerate(rows, start):
+        serializer = ProjectUserSerializer(data=row if isinstance(row, dict) else {})
+        if not serializer.is_valid():
+            errors.append({'type': 'error', 'row': number, 'errors': serializer.errors})
+        elif serializer.validated_data['username'] in seen:
+            errors.append({'type': 'error', 'row': number,
+                           'errors': {'username': ['Duplicate username in this batch.']}})
+        else:
+            seen.add(serializer.validated_data['username'])
+            valid.append((number, serializer.validated_data))
+
+    taken = set(User.objects.filter(username__in=seen).values_list('username', flat=True))
+    if taken:
+        errors += [{'type': 'error', 'row': number, 'errors': {'username': ['A user with that username already exists.']}}
+                   for number, data in valid if data['username'] in taken]
+        valid = [(number, data) for number, data in valid if data['username'] not in taken]
+    return valid, errors
+
+
+def insert_chunk(valid, hashes, group_ids):
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(username=data['username'], email=data['email'], password=encoded)
+            for (_, data), encoded in zip(valid, hashes)
+        ])
+        ProjectUser.objects.bulk_create([
+            ProjectUser(user=user, role=data['role']) for user, (_, data) in zip(users, valid)
+        ])
+        User.groups.through.objects.bulk_create([
+            User.groups.through(user_id=user.id, group_id=group_ids[data['role']])
+            for user, (_, data) in zip(users, valid)
+        ])
+    return users
+
+
+def provision(rows, chunk_size=None, processes=None):
+    """
+    Create the users described by ``rows``, yielding ``progress`` events
+    after each chunk, ``error`` events for rejected rows and a final
+    ``summary``. Row numbers start at 1.
+    """
+    chunk_size = chunk_size or settings.PROVISION_CHUNK_SIZE
+    processes = settings.PROVISION_PROCESSES if processes is None else processes
+    group_ids = role_registry.group_ids()
+    created = failed = 0
+
+    pool = None
+    if processes > 0:
+        # "spawn" rather than fork: forking a multi-threaded server process
+        # can copy locks held by other threads.
+        pool = ProcessPoolExecutor(max_workers=processes, initializer=setup_hashing_worker,
+                                   mp_context=multiprocessing.get_context('spawn'))
+    try:
+        for start in range(0, len(rows), chunk_size):
+            valid, errors = validate_chunk(rows[start:start + chunk_size], start + 1)
+            if valid:
+                hashes = hash_passwords([data['password'] for _, data in valid], pool, processes)
+                try:
+                    insert_chunk(valid, hashes, group_ids)
+                    created += len(valid)
+                except IntegrityError:
+                    # A concurrent request took one of the usernames since
+                    # validation; nothing of this chunk was written.
+                    errors += [{'type': 'error', 'row': number,
+                                'errors': {'non_field_errors': ['Conflicting write, retry this row.']}}
+                               for number, _ in valid]
+            failed += len(errors)
+            yield from sorted(errors, key=lambda event: event['row'])
+            yield {'type': 'progress', 'processed': min(start + chunk_size, len(rows)),
+                   'total': len(rows), 'created': created, 'failed': failed}
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    yield {'type': 'summary', 'total': len(rows), 'created': created, 'failed': failed}
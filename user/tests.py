@@ -1,3 +1,170 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.models import ProjectUser
+from core.roles import role_cache
+from .credentials import HashingPool, LoginBusy
+from .provisioning import provision
+
+
+class LoginTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='member', password='password123')
+        ProjectUser.objects.create(user=self.user, role='member')
+
+    def login(self, username='member', password='password123'):
+        return self.client.post('/user/login', {'username': username, 'password': password})
+
+    def test_login_returns_access_token(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access_token', response.json())
+        self.assertEqual(self.login(password='wrong').status_code, 401)
+        self.assertEqual(self.login(username='nobody').status_code, 401)
+
+    def test_username_bucket_rejects_before_hashing(self):
+        for _ in range(5):
+            self.assertEqual(self.login(password='wrong').status_code, 401)
+        with mock.patch('user.credentials.verify_password') as verify:
+            response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        verify.assert_not_called()
+
+    @override_settings(LOGIN_IP_BURST=2)
+    def test_ip_bucket_covers_all_usernames(self):
+        self.assertEqual(self.login(username='a').status_code, 401)
+        self.assertEqual(self.login(username='b').status_code, 401)
+        self.assertEqual(self.login(username='c').status_code, 429)
+
+    def test_saturated_hashing_pool_answers_503(self):
+        with mock.patch('user.credentials.hashing_pool.run', side_effect=LoginBusy):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1200)
+    def test_hash_is_upgraded_on_login(self):
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1200$'))
+        self.assertTrue(self.user.check_password('password123'))
+
+
+class HashingPoolTestCase(TestCase):
+    @override_settings(LOGIN_HASH_WORKERS=1, LOGIN_HASH_QUEUE=0)
+    def test_pool_rejects_work_when_full(self):
+        pool = HashingPool()
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        worker = threading.Thread(target=pool.run, args=(block,))
+        worker.start()
+        started.wait()
+        try:
+            with self.assertRaises(LoginBusy):
+                pool.run(len, 'x')
+        finally:
+            release.set()
+            worker.join()
+        self.assertEqual(pool.run(len, 'abc'), 3)
+        pool.shutdown()
+
+
+@override_settings(PROVISION_PROCESSES=0)
+class ProvisionTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        role_cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='password123')
+        ProjectUser.objects.create(user=self.admin, role='admin')
+        self.client.force_authenticate(self.admin)
+
+    def events(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def rows(self, count, start=0):
+        return [{'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'secret-pass',
+                 'role': 'member'} for i in range(start, start + count)]
+
+    def test_json_batch_reports_row_errors(self):
+        rows = self.rows(2) + [
+            {'username': 'admin', 'email': 'a@example.com', 'password': 'x', 'role': 'member'},
+            {'username': 'user9', 'email': 'not-an-email', 'password': 'x', 'role': 'owner'},
+            self.rows(1)[0],
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            events = self.events(self.client.post('/user/provision', rows, format='json'))
+        inserts = [query['sql'].split('"')[1] for query in queries if query['sql'].startswith('INSERT')]
+        self.assertEqual([table for table in inserts if table != 'auth_group'],
+                         ['auth_user', 'core_projectuser', 'auth_user_groups'])
+
+        errors = [event for event in events if event['type'] == 'error']
+        self.assertEqual([event['row'] for event in errors], [3, 4, 5])
+        self.assertEqual(set(errors[1]['errors']), {'email', 'role'})
+        self.assertEqual(events[-1], {'type': 'summary', 'total': 5, 'created': 2, 'failed': 3})
+
+        user = User.objects.get(username='user1')
+        self.assertTrue(user.check_password('secret-pass'))
+        self.assertEqual(ProjectUser.objects.get(user=user).role, 'member')
+        self.assertEqual(list(user.groups.values_list('name', flat=True)), ['member'])
+
+    @override_settings(PROVISION_CHUNK_SIZE=2)
+    def test_csv_upload_streams_progress_per_chunk(self):
+        content = 'username,email,password,role\n' + ''.join(
+            f"{row['username']},{row['email']},{row['password']},manager\n" for row in self.rows(5))
+        upload = SimpleUploadedFile('users.csv', content.encode(), content_type='text/csv')
+        events = self.events(self.client.post('/user/provision', {'file': upload}, format='multipart'))
+        progress = [event['processed'] for event in events if event['type'] == 'progress']
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual(User.objects.filter(groups__name='manager', username__startswith='user').count(), 5)
+
+    @override_settings(PROVISION_CHUNK_SIZE=2)
+    async def test_streams_progress_under_asgi(self):
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.admin).access_token}'}
+        response = await self.async_client.post('/user/provision', self.rows(3), content_type='application/json',
+                                                 headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        events = [json.loads(chunk) async for chunk in response.streaming_content]
+        self.assertEqual([event['type'] for event in events], ['progress', 'progress', 'summary'])
+
+    def test_requires_admin(self):
+        member = User.objects.create_user(username='member', password='password123')
+        ProjectUser.objects.create(user=member, role='member')
+        self.client.force_authenticate(member)
+        self.assertEqual(self.client.post('/user/provision', self.rows(1), format='json').status_code, 403)
+
+    def test_passwords_hash_in_worker_processes(self):
+        events = list(provision(self.rows(3), processes=2))
+        self.assertEqual(events[-1]['created'], 3)
+        self.assertTrue(User.objects.get(username='user2').check_password('secret-pass'))
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(self.rows(3), f)
+        try:
+            out = StringIO()
+            call_command('provision_users', f.name, processes=0, stdout=out, stderr=StringIO())
+        finally:
+            os.unlink(f.name)
+        self.assertIn('Created 3 of 3 users', out.getvalue())
@@ -0,0 +1,114 @@
+"""
+Token-bucket throttles for the login endpoint.
+
+Each bucket is stored as a single number in the shared cache: the GCRA
+"theoretical arrival time" in milliseconds, which is equivalent to a token
+bucket of ``capacity`` tokens refilled at ``rate`` per second. On Redis the
+check-and-update runs as one Lua script, so concurrent workers cannot
+over-admit; other cache backends (locmem in tests and benchmarks) fall back
+to a plain read and write.
+
+The throttles run in DRF's ``initial()``, before the view, so a rejected
+login never reaches the password hasher.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import BaseThrottle
+
+
+GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+if tat < now then tat = now end
+local wait = tat + interval - burst - now
+if wait > 0 then return wait end
+redis.call('SET', KEYS[1], tat + interval, 'PX', burst)
+return 0
+"""
+
+
+class TokenBucket:
+    """
+    ``capacity`` requests at once, refilled at ``rate`` requests per second.
+    """
+
+    def __init__(self, prefix, capacity, rate):
+        self.prefix = prefix
+        self.capacity = capacity
+        self.rate = rate
+
+    def take(self, ident):
+        """
+        Take a token for ``ident``. Returns 0 if admitted, otherwise the
+        number of seconds until a token is available.
+        """
+        now = int(time.time() * 1000)
+        interval = math.ceil(1000 / self.rate)
+        burst = interval * self.capacity
+        key = f'core:ratelimit:{self.prefix}:{hashlib.sha1(ident.encode()).hexdigest()}'
+        backend = caches['default']
+        if isinstance(backend, RedisCache):
+            client = backend._cache.get_client(key, write=True)
+            wait = client.eval(GCRA_SCRIPT, 1, backend.make_and_validate_key(key), now, interval, burst)
+        else:
+            tat = max(cache.get(key, now), now)
+            wait = tat + interval - burst - now
+            if wait <= 0:
+                cache.set(key, tat + interval, math.ceil(burst / 1000))
+        return max(int(wait), 0) / 1000
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base class: subclasses name the settings holding the bucket's capacity
+    and rate, and return the identity to throttle on.
+    """
+    scope = None
+    capacity_setting = None
+    rate_setting = None
+
+    def get_bucket(self):
+        return TokenBucket(self.scope, getattr(settings, self.capacity_setting),
+                           getattr(settings, self.rate_setting))
+
+    def get_cache_ident(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        ident = self.get_cache_ident(request)
+        if ident is None:
+            return True
+        self.retry_after = self.get_bucket().take(ident)
+        return self.retry_after == 0
+
+    def wait(self):
+        return self.retry_after
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    scope = 'login-ip'
+    capacity_setting = 'LOGIN_IP_BURST'
+    rate_setting = 'LOGIN_IP_RATE'
+
+    def get_cache_ident(self, request):
+        # Honours REST_FRAMEWORK['NUM_PROXIES'] behind a load balancer
+        return self.get_ident(request)
+
+
+class LoginUsernameThrottle(TokenBucketThrottle):
+    scope = 'login-user'
+    capacity_setting = 'LOGIN_USERNAME_BURST'
+    rate_setting = 'LOGIN_USERNAME_RATE'
+
+    def get_cache_ident(self, request):
+        username = request.data.get('username')
+        if not isinstance(username, str) or not username:
+            return None
+        return username.lower()
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import *
+from core.routing import lazy_view
 
 urlpatterns=[
-    path('login',LoginView.as_view(),               name='login'),
-    path('createuser',ProjectUserCreate.as_view(),  name='createuser')
+    path('login',lazy_view('user.views.LoginView'),                 name='login'),
+    path('createuser',lazy_view('user.views.ProjectUserCreate'),    name='createuser'),
+    path('provision',lazy_view('user.views.ProvisionUsers'),        name='provision'),
 
 ]
\ No newline at end of file
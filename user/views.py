@@ -1,26 +1,39 @@
+import json
+from django.conf import settings
 from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate
-from .serializers import *
+from core.authentication import add_token_claims
+from core.permissions import AdminPermission
+from core.streaming import streaming_response
+from .credentials import LoginBusy, verify_credentials
+from .provisioning import ProvisioningError, parse_rows, provision
+from .serializers import ProjectUserSerializer
+from .throttling import LoginIPThrottle, LoginUsernameThrottle
 
 
 class LoginView(APIView):
     """
     LoginView handles POST requests for user authentication.
+    Requests are rate limited per client IP and per username before any
+    password hashing happens.
 
     """
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
+
     def post(self, request):
         try:
             username = request.data.get('username')
             password = request.data.get('password')
             
-            user = authenticate(username=username, password=password)
+            user = verify_credentials(request, username, password)
             if user:
 
-                # Generate a refresh token for the authenticated user
-                refresh = RefreshToken.for_user(user)
+                # Generate a refresh token for the authenticated user, with
+                # the roles and token generation for stateless auth
+                refresh = add_token_claims(RefreshToken.for_user(user), user)
 
                 # Return the access token in the response
                 return Response({"status":True,
@@ -29,6 +42,9 @@ class LoginView(APIView):
             else:
                 return Response({'Status':False,'error': 'Invalid credentials'}, 
                                 status=status.HTTP_401_UNAUTHORIZED)
+        except LoginBusy:
+            return Response({'Status':False,'Message':'Too many logins in progress, retry shortly'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
         except Exception as e:
             print(e)
             return Response({'Status':False,'Message':'Something unexpected occured'},
@@ -54,4 +70,42 @@ class ProjectUserCreate(APIView):
         except Exception as e:
             print(e)
             return Response({'Status':False,'Message':'Something unexpected occured'},
-                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ProvisionUsers(APIView):
+    """
+    ProvisionUsers handles POST requests to create users in bulk, from a JSON
+    array in the body or an uploaded CSV/JSON ``file`` (use ``?input=csv`` or
+    ``?input=json`` when the file name does not tell). Progress and per-row
+    errors are streamed back as NDJSON.
+    Only authenticated users with admin permissions can access this view.
+
+    """
+    permission_classes = [IsAuthenticated,AdminPermission]
+
+    def post(self, request):
+        try:
+            upload = request.FILES.get('file')
+            try:
+                if upload is not None:
+                    input_format = request.query_params.get('input') or (
+                        'csv' if upload.name.lower().endswith('.csv') else 'json')
+                    rows = parse_rows(upload.read(), input_format)
+                elif isinstance(request.data, list):
+                    rows = request.data
+                else:
+                    raise ProvisioningError('Send a JSON array of users or upload a file')
+            except ProvisioningError as e:
+                return Response({'Status':False,'Message':str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if len(rows) > settings.PROVISION_MAX_ROWS:
+                return Response({'Status':False,'Message':f'At most {settings.PROVISION_MAX_ROWS} users per request'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            events = (json.dumps(event) + '\n' for event in provision(rows))
+            # One event per thread hop under ASGI, so progress arrives as it is made
+            return streaming_response(request, events, 'application/x-ndjson')
+        except Exception as e:
+            print(e)
+            return Response({'Status':False,'Message':'Something unexpected occured'},
+                            status=status.HTTP_500_INTERNAL_SERVER_ERROR)